@@ -0,0 +1,79 @@
+"""Resultados da análise de áudio feita na ingestão (loudness e forma de onda).
+
+O cálculo fica em loudness.py, que depende de NumPy/SciPy e do FFmpeg e só
+é importado pelos jobs de análise; este módulo guarda e consulta os
+resultados, sem dependências pesadas para o processo web.
+"""
+import json
+import threading
+
+from database import get_db
+
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def save_analysis(filename, result):
+    """Grava o resultado da análise da faixa"""
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT OR REPLACE INTO track_analysis
+            (filename, loudness, replay_gain, peak, duration, waveform)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (filename, result['loudness'], result['replay_gain'], result['peak'],
+          result['duration'], json.dumps(result['waveform'])))
+    conn.commit()
+    conn.close()
+
+
+def save_failure(filename):
+    """Grava uma análise vazia para a faixa que não pôde ser decodificada.
+
+    Assim um arquivo corrompido não agenda o FFmpeg de novo a cada reprodução;
+    o player toca a faixa sem normalização nem forma de onda.
+    """
+    save_analysis(filename, {'loudness': None, 'replay_gain': None, 'peak': None,
+                             'duration': None, 'waveform': []})
+
+
+def get_analysis(filename):
+    """Retorna a análise gravada da faixa, ou None se ainda não existe"""
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM track_analysis WHERE filename = ?', (filename,))
+    row = cursor.fetchone()
+    conn.close()
+    if not row:
+        return None
+    return {
+        'filename': row['filename'],
+        'loudness': row['loudness'],
+        'replay_gain': row['replay_gain'],
+        'peak': row['peak'],
+        'duration': row['duration'],
+        'waveform': json.loads(row['waveform'] or '[]'),
+    }
+
+
+def delete_analysis(filename):
+    """Remove a análise de uma faixa excluída do disco"""
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('DELETE FROM track_analysis WHERE filename = ?', (filename,))
+    conn.commit()
+    conn.close()
+
+
+def claim(filename):
+    """Marca a faixa como em análise; retorna False se já há uma análise em andamento"""
+    with _pending_lock:
+        if filename in _pending:
+            return False
+        _pending.add(filename)
+        return True
+
+
+def release(filename):
+    with _pending_lock:
+        _pending.discard(filename)
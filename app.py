@@ -1,22 +1,60 @@
 import os
-import yt_dlp
+import unicodedata
+import zipfile
 from datetime import datetime
-from io import BytesIO
+from urllib.parse import quote
 from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for, flash
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from database import init_db, get_db, User
+from database import (STORAGE_ROOT, prepare, get_db, get_list_version, bump_list_version,
+                      record_play, clear_play_stats, User)
 from forms import LoginForm, RegistrationForm
-
-# Configuração de armazenamento para Render
-STORAGE_AVAILABLE = False
-DOWNLOADS_DIR = '/tmp/downloads'
-print("⚠️ Usando armazenamento temporário. Downloads serão perdidos no redeploy.")
+from assets import init_assets
+from archive import stream_zip
+from downloader import DOWNLOADS_DIR
+import events
+import jobs
+import transfer
+import analysis
+import dedup
+import prefetch
+
+# Configuração de armazenamento para Render (DOWNLOADS_DIR vem de downloader.py)
+STORAGE_AVAILABLE = bool(STORAGE_ROOT)
+
+# Com LAZY_INIT=1 o esquema do banco é preparado uma única vez antes dos workers
+# (gunicorn.conf.py), e não na importação do app por cada um deles
+LAZY_INIT = os.environ.get('LAZY_INIT') == '1'
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY') or os.environ.get('SESSION_SECRET', 'dev-secret-key-change-in-production')
 
+# Sessões ficam em cookies assinados: qualquer instância com a mesma chave atende o usuário
+if os.environ.get('REDIS_URL') and app.secret_key == 'dev-secret-key-change-in-production':
+    print("⚠️ Várias instâncias exigem FLASK_SECRET_KEY/SESSION_SECRET igual em todas.")
+
+# Assets com hash gerados por build_assets.py (quando o build foi executado)
+init_assets(app)
+
 # Inicializar banco de dados
-init_db()
+if not LAZY_INIT:
+    prepare()
+
+# Endpoints cujas respostas controlam o próprio cache (não recebem no-store)
+SELF_CACHED_ENDPOINTS = {
+    'api_get_history',
+    'api_history_stats',
+    'api_get_favorites',
+    'api_get_playlists',
+    'api_get_library',
+    'api_track_analysis',
+    'api_stream_audio',
+}
+
+# Limite de variáveis por consulta do SQLite ao filtrar listas de arquivos
+ZIP_QUERY_BATCH = 500
+
+# Cache privado do navegador para o áudio, permitindo pré-carregar a próxima faixa
+STREAM_MAX_AGE = 3600
 
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -66,13 +104,64 @@ def register():
 def logout():
     logout_user()
     flash('Você saiu da sua conta.', 'info')
-    return redirect(url_for('login'))
+    response = redirect(url_for('login'))
+    # Remove do navegador as listas, faixas offline e páginas guardadas do usuário
+    response.headers['Clear-Site-Data'] = '"cache", "storage"'
+    return response
 
 @app.route('/')
 @login_required
 def index():
     return render_template('index.html', user=current_user)
 
+@app.route('/healthz')
+def healthz():
+    """Verificação de saúde do balanceador: sem login nem acesso ao banco"""
+    return 'ok', 200, {'Content-Type': 'text/plain'}
+
+@app.route('/sw.js')
+def service_worker():
+    """Service worker servido na raiz para controlar todo o app.
+
+    A versão dos assets vai no corpo: a cada build o arquivo muda, o navegador
+    reinstala o worker e o cache do shell é refeito a partir do manifest.
+    """
+    with open(os.path.join(app.static_folder, 'js', 'sw.js'), encoding='utf-8') as f:
+        source = f.read()
+    version = app.config.get('ASSET_VERSION', 'dev')
+    return app.response_class(f'// assets: {version}\n{source}', mimetype='application/javascript')
+
+def _conditional_list(name, load, extra=''):
+    """Responde uma lista do usuário com ETag, retornando 304 se o cliente já tem a versão atual"""
+    etag = f'{name}-{current_user.id}-{get_list_version(current_user.id, name)}{extra}'
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(load())
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def _notify_list(name):
+    """Avisa as abas abertas do usuário que uma lista mudou"""
+    events.publish(current_user.id, 'list', {'name': name})
+
+@app.route('/api/events')
+@login_required
+def api_events():
+    """Canal SSE com progresso de jobs e alterações nas listas do usuário"""
+    if not events.open_slot():
+        response = jsonify({'error': 'Muitas conexões de eventos abertas, tente novamente'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '30'
+        return response
+
+    response = app.response_class(events.stream(current_user.id), mimetype='text/event-stream')
+    response.headers['X-Accel-Buffering'] = 'no'
+    # O gunicorn fecha a resposta ao fim da conexão, inclusive quando o cliente desconecta
+    response.call_on_close(events.close_slot)
+    return response
+
 @app.route('/admin')
 @login_required
 def admin():
@@ -207,22 +296,123 @@ def api_get_downloads():
         'downloaded_at': row['downloaded_at']
     } for row in downloads])
 
+def _export_response(name, user_ids):
+    """Resposta em fluxo com o ZIP de exportação"""
+    download_name = f"ytbp-{name}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.zip"
+    response = app.response_class(transfer.export_archive(DOWNLOADS_DIR, user_ids),
+                                  mimetype='application/zip')
+    # Nomes de usuário aceitam qualquer caractere: como no send_file, o nome vai
+    # em ASCII no filename e completo (RFC 5987) no filename*
+    ascii_name = unicodedata.normalize('NFKD', download_name).encode('ascii', 'ignore').decode('ascii')
+    options = {'filename': ascii_name}
+    if ascii_name != download_name:
+        options['filename*'] = f"UTF-8''{quote(download_name, safe='')}"
+    response.headers.set('Content-Disposition', 'attachment', **options)
+    return response
+
+def _import_upload(target_user_id):
+    """Importa o ZIP enviado no campo 'file' e notifica as listas alteradas"""
+    upload = request.files.get('file')
+    if not upload:
+        return jsonify({'error': 'Envie o arquivo de exportação no campo "file"'}), 400
+
+    try:
+        stats, touched = transfer.import_archive(upload.stream, DOWNLOADS_DIR, target_user_id)
+    except (ValueError, zipfile.BadZipFile) as e:
+        return jsonify({'error': f'Erro ao importar: {str(e)}'}), 400
+
+    for user_id, list_name in touched:
+        events.publish(user_id, 'list', {'name': list_name})
+    return jsonify({'success': True, 'message': 'Importação concluída', 'stats': stats})
+
+@app.route('/api/admin/export', methods=['GET'])
+@login_required
+def api_admin_export():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Acesso negado'}), 403
+    return _export_response('instancia', None)
+
+@app.route('/api/admin/import', methods=['POST'])
+@login_required
+def api_admin_import():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Acesso negado'}), 403
+    return _import_upload(None)
+
+@app.route('/api/export', methods=['GET'])
+@login_required
+def api_export():
+    return _export_response(current_user.username, [current_user.id])
+
+@app.route('/api/import', methods=['POST'])
+@login_required
+def api_import():
+    return _import_upload(current_user.id)
+
 @app.route('/api/history', methods=['GET'])
 @login_required
 def api_get_history():
     limit = request.args.get('limit', 50, type=int)
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT * FROM history 
-        WHERE user_id = ? 
-        ORDER BY played_at DESC 
-        LIMIT ?
-    ''', (current_user.id, limit))
-    history = cursor.fetchall()
-    conn.close()
 
-    return jsonify([dict(row) for row in history])
+    def load():
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT * FROM history 
+            WHERE user_id = ? 
+            ORDER BY played_at DESC 
+            LIMIT ?
+        ''', (current_user.id, limit))
+        history = cursor.fetchall()
+        conn.close()
+        return [dict(row) for row in history]
+
+    return _conditional_list('history', load, f'-{limit}')
+
+@app.route('/api/history/stats', methods=['GET'])
+@login_required
+def api_history_stats():
+    """Tocadas recentemente (sem repetições), mais tocadas e sugestões do que tocar em seguida"""
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+
+    def load():
+        # Consultas por índice limitadas a `limit`: o custo não cresce com o histórico
+        conn = get_db()
+        cursor = conn.cursor()
+        columns = 'track_key, title, youtube_url, video_id, playlist_id, thumbnail, play_count, last_played'
+        cursor.execute(f'''
+            SELECT {columns} FROM play_stats
+            WHERE user_id = ?
+            ORDER BY last_seq DESC
+            LIMIT ?
+        ''', (current_user.id, limit))
+        recent = [dict(row) for row in cursor.fetchall()]
+
+        cursor.execute(f'''
+            SELECT {columns} FROM play_stats
+            WHERE user_id = ?
+            ORDER BY play_count DESC, last_seq DESC
+            LIMIT ?
+        ''', (current_user.id, limit))
+        top = [dict(row) for row in cursor.fetchall()]
+
+        # Faixas que costumam tocar depois da última reproduzida
+        suggestions = []
+        if recent:
+            cursor.execute('''
+                SELECT s.track_key, s.title, s.youtube_url, s.video_id, s.playlist_id, s.thumbnail,
+                       s.play_count, s.last_played, t.count AS times_after
+                FROM play_transitions t
+                JOIN play_stats s ON s.user_id = t.user_id AND s.track_key = t.to_key
+                WHERE t.user_id = ? AND t.from_key = ?
+                ORDER BY t.count DESC, t.last_seq DESC
+                LIMIT ?
+            ''', (current_user.id, recent[0]['track_key'], limit))
+            suggestions = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return {'recent': recent, 'top': top, 'next': suggestions}
+
+    return _conditional_list('history', load, f'-stats-{limit}')
 
 @app.route('/api/history', methods=['POST'])
 @login_required
@@ -238,8 +428,12 @@ def api_add_history():
         VALUES (?, ?, ?, ?, ?, ?)
     ''', (current_user.id, data.get('title', 'Sem título'), data['youtube_url'],
           data.get('video_id'), data.get('playlist_id'), data.get('thumbnail')))
+    record_play(cursor, current_user.id, cursor.lastrowid, data.get('title', 'Sem título'),
+                data['youtube_url'], data.get('video_id'), data.get('playlist_id'), data.get('thumbnail'))
+    bump_list_version(cursor, current_user.id, 'history')
     conn.commit()
     conn.close()
+    _notify_list('history')
 
     return jsonify({'success': True, 'message': 'Adicionado ao histórico'})
 
@@ -249,23 +443,29 @@ def api_clear_history():
     conn = get_db()
     cursor = conn.cursor()
     cursor.execute('DELETE FROM history WHERE user_id = ?', (current_user.id,))
+    clear_play_stats(cursor, current_user.id)
+    bump_list_version(cursor, current_user.id, 'history')
     conn.commit()
     conn.close()
+    _notify_list('history')
     return jsonify({'success': True, 'message': 'Histórico limpo'})
 
 @app.route('/api/favorites', methods=['GET'])
 @login_required
 def api_get_favorites():
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT * FROM favorites 
-        WHERE user_id = ? 
-        ORDER BY added_at DESC
-    ''', (current_user.id,))
-    favorites = cursor.fetchall()
-    conn.close()
-    return jsonify([dict(row) for row in favorites])
+    def load():
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT * FROM favorites 
+            WHERE user_id = ? 
+            ORDER BY added_at DESC
+        ''', (current_user.id,))
+        favorites = cursor.fetchall()
+        conn.close()
+        return [dict(row) for row in favorites]
+
+    return _conditional_list('favorites', load)
 
 @app.route('/api/favorites', methods=['POST'])
 @login_required
@@ -287,8 +487,10 @@ def api_add_favorite():
         VALUES (?, ?, ?, ?, ?, ?)
     ''', (current_user.id, data.get('title', 'Sem título'), data['youtube_url'],
           data.get('video_id'), data.get('playlist_id'), data.get('thumbnail')))
+    bump_list_version(cursor, current_user.id, 'favorites')
     conn.commit()
     conn.close()
+    _notify_list('favorites')
 
     return jsonify({'success': True, 'message': 'Adicionado aos favoritos'})
 
@@ -299,27 +501,33 @@ def api_remove_favorite(favorite_id):
     cursor = conn.cursor()
     cursor.execute('DELETE FROM favorites WHERE id = ? AND user_id = ?',
                   (favorite_id, current_user.id))
-    conn.commit()
     rows_affected = cursor.rowcount
+    if rows_affected:
+        bump_list_version(cursor, current_user.id, 'favorites')
+    conn.commit()
     conn.close()
 
     if rows_affected:
+        _notify_list('favorites')
         return jsonify({'success': True, 'message': 'Removido dos favoritos'})
     return jsonify({'error': 'Favorito não encontrado'}), 404
 
 @app.route('/api/playlists', methods=['GET'])
 @login_required
 def api_get_playlists():
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT * FROM playlists 
-        WHERE user_id = ? 
-        ORDER BY created_at DESC
-    ''', (current_user.id,))
-    playlists = cursor.fetchall()
-    conn.close()
-    return jsonify([dict(row) for row in playlists])
+    def load():
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT * FROM playlists 
+            WHERE user_id = ? 
+            ORDER BY created_at DESC
+        ''', (current_user.id,))
+        playlists = cursor.fetchall()
+        conn.close()
+        return [dict(row) for row in playlists]
+
+    return _conditional_list('playlists', load)
 
 @app.route('/api/playlists', methods=['POST'])
 @login_required
@@ -335,9 +543,11 @@ def api_create_playlist():
         VALUES (?, ?, ?, ?, ?, ?)
     ''', (current_user.id, data['name'], data['youtube_url'],
           data.get('video_id'), data.get('playlist_id'), data.get('thumbnail')))
-    conn.commit()
     playlist_id = cursor.lastrowid
+    bump_list_version(cursor, current_user.id, 'playlists')
+    conn.commit()
     conn.close()
+    _notify_list('playlists')
 
     return jsonify({'success': True, 'id': playlist_id, 'message': 'Playlist criada'})
 
@@ -348,11 +558,14 @@ def api_delete_playlist(playlist_id):
     cursor = conn.cursor()
     cursor.execute('DELETE FROM playlists WHERE id = ? AND user_id = ?',
                   (playlist_id, current_user.id))
-    conn.commit()
     rows_affected = cursor.rowcount
+    if rows_affected:
+        bump_list_version(cursor, current_user.id, 'playlists')
+    conn.commit()
     conn.close()
 
     if rows_affected:
+        _notify_list('playlists')
         return jsonify({'success': True, 'message': 'Playlist removida'})
     return jsonify({'error': 'Playlist não encontrada'}), 404
 
@@ -363,43 +576,9 @@ def api_download_audio():
     if not data or not data.get('youtube_url'):
         return jsonify({'error': 'URL do YouTube é obrigatória'}), 400
 
-    try:
-        os.makedirs(DOWNLOADS_DIR, exist_ok=True)
-
-        ydl_opts = {
-            'format': 'bestaudio/best',
-            'outtmpl': os.path.join(DOWNLOADS_DIR, '%(title)s.%(ext)s'),
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '192',
-            }],
-            'keepvideo': False,
-            'quiet': True,
-            'no_warnings': True,
-        }
-
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(data['youtube_url'], download=True)
-            title = info.get('title', 'audio')
-            safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).strip()
-            filename = f"{safe_title}.mp3"
-            filepath = os.path.join(DOWNLOADS_DIR, filename)
-
-            # Registrar no banco de dados
-            conn = get_db()
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO downloads (user_id, title, youtube_url, filename)
-                VALUES (?, ?, ?, ?)
-            ''', (current_user.id, title, data['youtube_url'], filename))
-            conn.commit()
-            conn.close()
-
-            return send_file(filepath, as_attachment=True, download_name=filename, mimetype='audio/mpeg')
-
-    except Exception as e:
-        return jsonify({'error': f'Erro ao baixar áudio: {str(e)}'}), 500
+    # O download roda em segundo plano; progresso e conclusão chegam por /api/events
+    job_id = jobs.submit('download_audio', current_user.id, youtube_url=data['youtube_url'])
+    return jsonify({'success': True, 'job_id': job_id}), 202
 
 @app.route('/api/download-playlist', methods=['POST'])
 @login_required
@@ -408,89 +587,49 @@ def api_download_playlist():
     if not data or not data.get('youtube_url'):
         return jsonify({'error': 'URL do YouTube é obrigatória'}), 400
 
-    try:
-        os.makedirs(DOWNLOADS_DIR, exist_ok=True)
-
-        ydl_opts = {
-            'format': 'bestaudio/best',
-            'outtmpl': os.path.join(DOWNLOADS_DIR, '%(title)s.%(ext)s'),
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '192',
-            }],
-            'keepvideo': False,
-            'quiet': False,
-            'ignoreerrors': True,
-        }
-
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(data['youtube_url'], download=True)
-
-            conn = get_db()
-            cursor = conn.cursor()
-            count = 0
-
-            if 'entries' in info:
-                for entry in info['entries']:
-                    if entry:
-                        title = entry.get('title', 'Unknown')
-                        safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).strip()
-                        filename = f"{safe_title}.mp3"
-                        
-                        # Verificar se já existe para evitar duplicatas
-                        cursor.execute('''
-                            SELECT id FROM downloads 
-                            WHERE user_id = ? AND filename = ?
-                        ''', (current_user.id, filename))
-                        
-                        if not cursor.fetchone():
-                            cursor.execute('''
-                                INSERT INTO downloads (user_id, title, youtube_url, filename)
-                                VALUES (?, ?, ?, ?)
-                            ''', (current_user.id, title, entry.get('webpage_url', data['youtube_url']), filename))
-                            count += 1
-
-            conn.commit()
-            conn.close()
-
-            return jsonify({
-                'success': True,
-                'message': f'{count} músicas baixadas com sucesso!',
-                'total': count
-            })
+    job_id = jobs.submit('download_playlist', current_user.id, youtube_url=data['youtube_url'])
+    return jsonify({'success': True, 'job_id': job_id}), 202
 
-    except Exception as e:
-        return jsonify({'error': f'Erro ao baixar playlist: {str(e)}'}), 500
+def _user_library(user_id):
+    """Faixas do usuário que ainda existem em disco, das mais recentes às mais antigas"""
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT DISTINCT title, filename, downloaded_at 
+        FROM downloads 
+        WHERE user_id = ? 
+        ORDER BY downloaded_at DESC
+    ''', (user_id,))
+    downloads = cursor.fetchall()
+    conn.close()
+
+    library = []
+    for row in downloads:
+        # Verificar se o arquivo existe localmente
+        filepath = os.path.join(DOWNLOADS_DIR, row['filename'])
+        if os.path.exists(filepath):
+            library.append({
+                'title': row['title'],
+                'filename': row['filename'],
+                'downloaded_at': row['downloaded_at']
+            })
+    return library
 
 @app.route('/api/library', methods=['GET'])
 @login_required
 def api_get_library():
     """Retorna todas as músicas baixadas pelo usuário atual"""
-    try:
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT DISTINCT title, filename, downloaded_at 
-            FROM downloads 
-            WHERE user_id = ? 
-            ORDER BY downloaded_at DESC
-        ''', (current_user.id,))
-        downloads = cursor.fetchall()
-        conn.close()
-
-        library = []
-        for row in downloads:
-            # Verificar se o arquivo existe localmente
-            filepath = os.path.join(DOWNLOADS_DIR, row['filename'])
-            if os.path.exists(filepath):
-                library.append({
-                    'title': row['title'],
-                    'filename': row['filename'],
-                    'downloaded_at': row['downloaded_at']
-                })
+    def load():
+        return _user_library(current_user.id)
 
-        return jsonify(library)
+    try:
+        # Arquivos podem sumir do disco (redeploy, exclusão por outro usuário),
+        # então a data de modificação da pasta também entra no ETag
+        try:
+            folder_mtime = os.stat(DOWNLOADS_DIR).st_mtime_ns
+        except OSError:
+            folder_mtime = 0
+        return _conditional_list('library', load, f'-{folder_mtime}')
 
     except Exception as e:
         return jsonify({'error': f'Erro ao carregar biblioteca: {str(e)}'}), 500
@@ -504,24 +643,125 @@ def api_stream_audio(filename):
         if not os.path.exists(filepath):
             return jsonify({'error': 'Arquivo não encontrado'}), 404
         
-        return send_file(
+        response = send_file(
             filepath,
             mimetype='audio/mpeg',
-            as_attachment=False,
+            as_attachment=request.args.get('download') == '1',
             download_name=filename
         )
+        response.cache_control.no_cache = None
+        response.cache_control.private = True
+        response.cache_control.max_age = STREAM_MAX_AGE
+        return response
     except Exception as e:
         return jsonify({'error': f'Erro ao carregar áudio: {str(e)}'}), 500
 
+@app.route('/api/library/queue', methods=['GET'])
+@login_required
+def api_library_queue():
+    """Próximas faixas previstas para o player; aquece o cache de disco delas"""
+    try:
+        n = min(max(request.args.get('n', prefetch.QUEUE_SIZE, type=int), 0), prefetch.MAX_QUEUE_SIZE)
+        library = _user_library(current_user.id)
+        by_name = {track['filename']: track for track in reversed(library)}
+        # Downloads repetidos da mesma faixa aparecem uma vez só na fila
+        filenames = list(dict.fromkeys(track['filename'] for track in library))
+
+        upcoming = prefetch.upcoming(
+            filenames,
+            current=request.args.get('current'),
+            shuffle=request.args.get('shuffle') == '1',
+            repeat=request.args.get('repeat') == '1',
+            seed=request.args.get('seed', ''),
+            n=n
+        )
+        prefetch.warm(os.path.join(DOWNLOADS_DIR, filename) for filename in upcoming)
+        return jsonify({'tracks': [by_name[filename] for filename in upcoming]})
+    except Exception as e:
+        return jsonify({'error': f'Erro ao calcular a fila: {str(e)}'}), 500
+
+def _selected_tracks(user_id, filenames):
+    """Caminhos das faixas pedidas que estão na biblioteca do usuário, na ordem pedida"""
+    filenames = list(dict.fromkeys(filenames))
+    allowed = set()
+    conn = get_db()
+    cursor = conn.cursor()
+    for i in range(0, len(filenames), ZIP_QUERY_BATCH):
+        batch = filenames[i:i + ZIP_QUERY_BATCH]
+        placeholders = ', '.join('?' for _ in batch)
+        cursor.execute(f'''
+            SELECT DISTINCT filename FROM downloads
+            WHERE user_id = ? AND filename IN ({placeholders})
+        ''', (user_id, *batch))
+        allowed.update(row['filename'] for row in cursor.fetchall())
+    conn.close()
+    return [(filename, os.path.join(DOWNLOADS_DIR, filename))
+            for filename in filenames if filename in allowed]
+
+def _playlist_tracks(user_id, playlist_url):
+    """Caminhos das faixas de uma playlist baixada, numeradas na ordem da playlist"""
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT p.position, p.filename FROM playlist_tracks p
+        WHERE p.user_id = ? AND p.playlist_url = ?
+          AND EXISTS (SELECT 1 FROM downloads d WHERE d.user_id = p.user_id AND d.filename = p.filename)
+        ORDER BY p.position
+    ''', (user_id, playlist_url))
+    rows = cursor.fetchall()
+    conn.close()
+    width = len(str(rows[-1]['position'])) if rows else 1
+    return [(f"{row['position']:0{width}d} - {row['filename']}", os.path.join(DOWNLOADS_DIR, row['filename']))
+            for row in rows]
+
+@app.route('/api/library/zip', methods=['GET', 'POST'])
+@login_required
+def api_library_zip():
+    """ZIP em fluxo das faixas escolhidas (?file=...) ou de uma playlist baixada (?playlist=url)"""
+    playlist_url = request.values.get('playlist')
+    if playlist_url:
+        tracks = _playlist_tracks(current_user.id, playlist_url)
+        name = 'playlist'
+    else:
+        tracks = _selected_tracks(current_user.id, request.values.getlist('file'))
+        name = 'musicas'
+
+    # Arquivos podem ter sumido do disco depois do download
+    tracks = [(arcname, path) for arcname, path in tracks if os.path.isfile(path)]
+    if not tracks:
+        return jsonify({'error': 'Nenhuma música encontrada para o ZIP'}), 404
+
+    download_name = f"ytbp-{name}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.zip"
+    response = app.response_class(stream_zip(tracks), mimetype='application/zip')
+    response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+    return response
+
+@app.route('/api/library/analysis/<path:filename>', methods=['GET'])
+@login_required
+def api_track_analysis(filename):
+    """Loudness e forma de onda da faixa; agenda a análise se ainda não foi feita"""
+    # Só faixas da biblioteca do usuário: o nome vem da URL e não pode apontar para fora dela
+    tracks = _selected_tracks(current_user.id, [filename])
+    if not tracks:
+        return jsonify({'error': 'Música não encontrada na biblioteca'}), 404
+
+    result = analysis.get_analysis(filename)
+    if result:
+        response = jsonify(result)
+        response.headers['Cache-Control'] = 'private, max-age=86400'
+        return response
+
+    if not os.path.isfile(tracks[0][1]):
+        return jsonify({'error': 'Arquivo não encontrado'}), 404
+
+    jobs.submit('analyze_track', current_user.id, filename=filename)
+    return jsonify({'status': 'pending'}), 202
+
 @app.route('/api/library/<path:filename>', methods=['DELETE'])
 @login_required
 def api_delete_library_track(filename):
     """Excluir música da biblioteca do usuário"""
     try:
-        filepath = os.path.join(DOWNLOADS_DIR, filename)
-        if os.path.exists(filepath):
-            os.remove(filepath)
-        
         # Remover do banco de dados
         conn = get_db()
         cursor = conn.cursor()
@@ -529,8 +769,20 @@ def api_delete_library_track(filename):
             DELETE FROM downloads 
             WHERE user_id = ? AND filename = ?
         ''', (current_user.id, filename))
+        removed = cursor.rowcount
+        # Com a deduplicação o mesmo arquivo pode estar na biblioteca de outros usuários
+        cursor.execute('SELECT 1 FROM downloads WHERE filename = ? LIMIT 1', (filename,))
+        orphan = removed > 0 and cursor.fetchone() is None
+        bump_list_version(cursor, current_user.id, 'library')
         conn.commit()
         conn.close()
+
+        filepath = os.path.join(DOWNLOADS_DIR, filename)
+        if orphan and os.path.exists(filepath):
+            os.remove(filepath)
+            analysis.delete_analysis(filename)
+            dedup.forget(filename)
+        _notify_list('library')
         
         return jsonify({'success': True, 'message': 'Música excluída'})
     except Exception as e:
@@ -538,6 +790,8 @@ def api_delete_library_track(filename):
 
 @app.after_request
 def add_cache_control(response):
+    if request.endpoint in SELF_CACHED_ENDPOINTS or response.cache_control.immutable:
+        return response
     response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
     response.headers['Pragma'] = 'no-cache'
     response.headers['Expires'] = '0'
@@ -0,0 +1,77 @@
+"""Geração de arquivos ZIP em fluxo, sem montá-los em memória ou em disco"""
+import os
+import time
+import zipfile
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _StreamBuffer:
+    """Destino de escrita do ZipFile que acumula bytes até serem entregues ao cliente"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _iter_source(source):
+    """Lê a origem de uma entrada (caminho, bytes ou iterável de bytes) em pedaços"""
+    if isinstance(source, (bytes, bytearray)):
+        yield bytes(source)
+    elif isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    else:
+        for chunk in source:
+            yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+
+
+def stream_zip(entries):
+    """Gera o ZIP em pedaços a partir de tuplas (nome, origem[, compressão]).
+
+    Sem compressão explícita a entrada é gravada sem recompressão (ZIP_STORED),
+    o ideal para MP3. Como o destino não é pesquisável, o zipfile grava os
+    tamanhos e CRCs em descritores após cada entrada.
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', allowZip64=True) as zf:
+        for entry in entries:
+            name, source = entry[0], entry[1]
+            compress_type = entry[2] if len(entry) > 2 else zipfile.ZIP_STORED
+
+            mtime = time.localtime()
+            if isinstance(source, (str, os.PathLike)):
+                mtime = time.localtime(os.path.getmtime(source))
+            info = zipfile.ZipInfo(name, date_time=mtime[:6])
+            info.compress_type = compress_type
+
+            with zf.open(info, 'w', force_zip64=True) as dest:
+                for chunk in _iter_source(source):
+                    dest.write(chunk)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+
+            data = buffer.drain()
+            if data:
+                yield data
+
+    # Diretório central, gravado ao fechar o arquivo
+    data = buffer.drain()
+    if data:
+        yield data
@@ -0,0 +1,67 @@
+"""Integração do app com os assets gerados por build_assets.py"""
+import hashlib
+import json
+import mimetypes
+import os
+from flask import request, send_from_directory
+
+# Um ano: os arquivos em static/dist/ mudam de nome quando o conteúdo muda
+HASHED_MAX_AGE = 31536000
+
+# Variantes pré-comprimidas, na ordem de preferência
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+def load_manifest(static_folder):
+    """Lê o manifest gerado no build; sem build, os arquivos originais são usados"""
+    path = os.path.join(static_folder, 'dist', 'manifest.json')
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def init_assets(app):
+    """Faz url_for('static') apontar para os arquivos com hash e serve as variantes comprimidas"""
+    manifest = load_manifest(app.static_folder)
+    app.config['ASSET_MANIFEST'] = manifest
+    if not manifest:
+        return
+
+    # Muda a cada build; vai no corpo do service worker para que ele se reinstale
+    app.config['ASSET_VERSION'] = hashlib.sha256(
+        json.dumps(manifest, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+    @app.url_defaults
+    def hashed_static_url(endpoint, values):
+        if endpoint == 'static':
+            filename = values.get('filename')
+            if filename in manifest:
+                values['filename'] = manifest[filename]
+
+    default_static = app.view_functions['static']
+
+    def static(filename):
+        # O manifest mantém o nome a cada build: não pode ficar em cache como imutável
+        if not filename.startswith('dist/') or filename == 'dist/manifest.json':
+            return default_static(filename=filename)
+
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        served, encoding = filename, None
+        for name, suffix in ENCODINGS:
+            # "gzip;q=0" também aparece na lista, mas recusa a codificação
+            if request.accept_encodings[name] > 0 and \
+                    os.path.isfile(os.path.join(app.static_folder, filename + suffix)):
+                served, encoding = filename + suffix, name
+                break
+
+        response = send_from_directory(app.static_folder, served,
+                                       mimetype=mimetype, max_age=HASHED_MAX_AGE)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = static
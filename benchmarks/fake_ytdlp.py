@@ -0,0 +1,104 @@
+"""Substituto local do yt_dlp.YoutubeDL para os benchmarks.
+
+Não acessa a rede: gera o áudio (um seno em WAV, gravado com a extensão
+.mp3 esperada pelo app) no caminho do outtmpl e chama os mesmos ganchos
+de progresso e pós-processamento que o yt-dlp real.
+"""
+import math
+import os
+import re
+import struct
+import time
+import wave
+
+SAMPLE_RATE = 22050
+
+# Segundos de áudio gerados por faixa e atraso simulado da extração
+TRACK_SECONDS = float(os.environ.get('FAKE_TRACK_SECONDS', '5'))
+EXTRACT_DELAY = float(os.environ.get('FAKE_EXTRACT_DELAY', '0'))
+PLAYLIST_SIZE = int(os.environ.get('FAKE_PLAYLIST_SIZE', '5'))
+
+
+def write_audio(path, seconds=TRACK_SECONDS, frequency=440.0):
+    """Grava um seno mono 16 bits no caminho indicado"""
+    frames = int(seconds * SAMPLE_RATE)
+    step = 2 * math.pi * frequency / SAMPLE_RATE
+    samples = struct.pack(f'<{frames}h', *(int(12000 * math.sin(i * step)) for i in range(frames)))
+    tmp_path = path + '.part'
+    with wave.open(tmp_path, 'wb') as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(SAMPLE_RATE)
+        out.writeframes(samples)
+    os.replace(tmp_path, path)
+
+
+class FakeYoutubeDL:
+    """Implementa o subconjunto da API do YoutubeDL usado por downloader.py"""
+
+    def __init__(self, params=None):
+        self.params = params or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def _entry(self, video_id, index=None, count=None):
+        title = f'Faixa Sintetica {video_id}'
+        info = {
+            'id': video_id,
+            'title': title,
+            'ext': 'mp3',
+            'webpage_url': f'https://www.youtube.com/watch?v={video_id}',
+            'playlist_index': index,
+            'n_entries': count,
+        }
+        outtmpl = self.params.get('outtmpl', '%(title)s.%(ext)s')
+        if isinstance(outtmpl, dict):
+            outtmpl = outtmpl.get('default', '%(title)s.%(ext)s')
+        path = outtmpl % {'title': title, 'ext': 'mp3', 'id': video_id}
+        info['filepath'] = path
+        info['requested_downloads'] = [{'filepath': path}]
+
+        match_filter = self.params.get('match_filter')
+        if match_filter and match_filter(info, incomplete=False):
+            return None
+
+        size = int(TRACK_SECONDS * SAMPLE_RATE * 2)
+        for hook in self.params.get('progress_hooks', []):
+            for done in (0, size // 2, size):
+                hook({'status': 'downloading', 'downloaded_bytes': done,
+                      'total_bytes': size, 'info_dict': info})
+        for hook in self.params.get('postprocessor_hooks', []):
+            hook({'status': 'started', 'postprocessor': 'ExtractAudio', 'info_dict': info})
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        write_audio(path, frequency=220.0 + (hash(video_id) % 660))
+
+        for hook in self.params.get('postprocessor_hooks', []):
+            hook({'status': 'finished', 'postprocessor': 'ExtractAudio', 'info_dict': info})
+        return info
+
+    def extract_info(self, url, download=True):
+        if EXTRACT_DELAY:
+            time.sleep(EXTRACT_DELAY)
+
+        playlist = re.search(r'[?&]list=([^&]+)', url)
+        if playlist:
+            playlist_id = playlist.group(1)
+            entries = [self._entry(f'{playlist_id}-{i}', i, PLAYLIST_SIZE)
+                       for i in range(1, PLAYLIST_SIZE + 1)]
+            return {'id': playlist_id, 'title': f'Playlist {playlist_id}',
+                    '_type': 'playlist', 'entries': entries}
+
+        video = re.search(r'(?:[?&]v=|youtu\.be/)([^?&]+)', url)
+        video_id = video.group(1) if video else 'video'
+        return self._entry(video_id)
+
+
+def install():
+    """Troca o YoutubeDL real pelo falso em todo o processo"""
+    import yt_dlp
+    yt_dlp.YoutubeDL = FakeYoutubeDL
@@ -0,0 +1,258 @@
+"""Benchmark de carga ponta a ponta das rotas do app.
+
+Cria um banco e uma pasta de downloads temporários, popula com dados
+sintéticos, troca o yt-dlp pelo extrator falso e dispara requisições
+concorrentes contra o app Flask, relatando p50/p99 e vazão por rota.
+
+Uso:
+    python -m benchmarks.run --concurrency 8 --requests 200
+    python -m benchmarks.run --json atual.json --baseline anterior.json --tolerance 0.25
+
+Com --baseline o comando termina com código 1 se o p99 de alguma rota
+piorar além da tolerância, para uso no pipeline antes do deploy.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ADMIN_EMAIL = 'admin@admin.com'
+ADMIN_PASSWORD = 'admin123'
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class Bench:
+    def __init__(self, app, emails, filenames, args):
+        import events
+        from benchmarks.seed import PASSWORD
+        from database import get_db
+
+        self.app = app
+        self.events = events
+        self.emails = emails
+        self.filenames = filenames
+        self.args = args
+        self.password = PASSWORD
+        self.local = threading.local()
+        self.counter = itertools.count()
+        self.slots = itertools.count()
+
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, email FROM users')
+        self.user_ids = {row['email']: row['id'] for row in cursor.fetchall()}
+        conn.close()
+
+    def _login(self, email, password):
+        client = self.app.test_client()
+        response = client.post('/login', data={'email': email, 'password': password})
+        if response.status_code != 302:
+            raise RuntimeError(f'Falha no login de {email}')
+        return client
+
+    def client(self, admin=False):
+        """Cliente autenticado da thread atual (um usuário sintético por thread)"""
+        local = self.local
+        if not hasattr(local, 'email'):
+            local.email = self.emails[next(self.slots) % len(self.emails)]
+            local.user = self._login(local.email, self.password)
+            local.admin = None
+        if admin:
+            if local.admin is None:
+                local.admin = self._login(ADMIN_EMAIL, ADMIN_PASSWORD)
+            return local.admin
+        return local.user
+
+    def wait_job(self, url, body):
+        """Enfileira um download e espera o evento de conclusão do job"""
+        client = self.client()
+        subscription = self.events.get_broker().subscribe(self.user_ids[self.local.email])
+        try:
+            response = client.post(url, json=body)
+            if response.status_code != 202:
+                return response.status_code
+            job_id = response.get_json()['job_id']
+            deadline = time.monotonic() + self.args.job_timeout
+            while time.monotonic() < deadline:
+                message = subscription.get(timeout=1)
+                if message is None:
+                    continue
+                payload = json.loads(message)
+                data = payload['data']
+                if payload['event'] == 'job' and data.get('job_id') == job_id:
+                    if data['status'] == 'done':
+                        return 200
+                    if data['status'] == 'error':
+                        return 500
+            return 504
+        finally:
+            subscription.close()
+
+    def scenarios(self):
+        stream_path = lambda: '/api/library/stream/' + self.filenames[next(self.counter) % len(self.filenames)]
+
+        def get(path, admin=False, headers=None):
+            response = self.client(admin).get(path() if callable(path) else path, headers=headers)
+            response.get_data()
+            response.close()
+            return response.status_code
+
+        n = self.args.requests
+        d = self.args.download_requests
+        return [
+            ('GET /api/library', lambda: get('/api/library'), {200}, n),
+            ('GET /api/history', lambda: get('/api/history'), {200}, n),
+            ('GET /api/history/stats', lambda: get('/api/history/stats'), {200}, n),
+            ('GET /api/favorites', lambda: get('/api/favorites'), {200}, n),
+            ('GET /api/library/stream', lambda: get(stream_path), {200}, n),
+            ('GET /api/library/stream (Range)',
+             lambda: get(stream_path, headers={'Range': 'bytes=0-65535'}), {206}, n),
+            ('GET /admin', lambda: get('/admin', admin=True), {200}, n),
+            ('GET /api/admin/downloads', lambda: get('/api/admin/downloads', admin=True), {200}, n),
+            ('POST /api/download-audio (fila)',
+             lambda: self.client().post('/api/download-audio', json={
+                 'youtube_url': f'https://www.youtube.com/watch?v=q{next(self.counter)}'}).status_code,
+             {202}, d),
+            ('download-audio ponta a ponta',
+             lambda: self.wait_job('/api/download-audio', {
+                 'youtube_url': f'https://www.youtube.com/watch?v=e{next(self.counter)}'}),
+             {200}, d),
+            ('download-playlist ponta a ponta',
+             lambda: self.wait_job('/api/download-playlist', {
+                 'youtube_url': f'https://www.youtube.com/playlist?list=PL{next(self.counter)}'}),
+             {200}, max(1, d // 4)),
+        ]
+
+    def login_all(self, pool):
+        """Autentica os clientes de todas as threads do pool antes de medir.
+
+        A barreira garante que cada thread pegue exatamente uma tarefa, então
+        nenhuma fica sem login (o scrypt dominaria a vazão medida).
+        """
+        barrier = threading.Barrier(self.args.concurrency)
+
+        def login(_):
+            self.client()
+            self.client(admin=True)
+            barrier.wait()
+
+        list(pool.map(login, range(self.args.concurrency)))
+
+    def run_scenario(self, pool, action, expected, count):
+        latencies, errors = [], 0
+        lock = threading.Lock()
+
+        def one(_):
+            nonlocal errors
+            start = time.perf_counter()
+            try:
+                status = action()
+            except Exception:
+                status = None
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if status not in expected:
+                    errors += 1
+
+        started = time.perf_counter()
+        list(pool.map(one, range(count)))
+        wall = time.perf_counter() - started
+
+        return {
+            'count': count,
+            'errors': errors,
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2),
+            'rps': round(count / wall, 1),
+        }
+
+
+def compare(results, baseline, tolerance):
+    """Lista as rotas cujo p99 piorou além da tolerância em relação ao baseline"""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous and result['p99_ms'] > previous['p99_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {previous['p99_ms']} ms -> {result['p99_ms']} ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de carga do YouTube Background Player')
+    parser.add_argument('--workdir', help='Pasta para o banco e os downloads (padrão: temporária)')
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--history', type=int, default=2000, help='Linhas de histórico por usuário')
+    parser.add_argument('--downloads', type=int, default=100, help='Downloads por usuário')
+    parser.add_argument('--favorites', type=int, default=50, help='Favoritos por usuário')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help='Requisições por rota de leitura')
+    parser.add_argument('--download-requests', type=int, default=20, help='Requisições por rota de download')
+    parser.add_argument('--job-timeout', type=float, default=120)
+    parser.add_argument('--only', help='Executa apenas as rotas cujo nome contém este texto')
+    parser.add_argument('--json', help='Grava os resultados neste arquivo')
+    parser.add_argument('--baseline', help='Resultados anteriores para detectar regressões')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='ytbp-bench-')
+    os.environ['DATABASE_PATH'] = os.path.join(workdir, 'database.db')
+    os.environ['DOWNLOADS_DIR'] = os.path.join(workdir, 'downloads')
+
+    from benchmarks import fake_ytdlp
+    fake_ytdlp.install()
+
+    from benchmarks.seed import seed
+    started = time.perf_counter()
+    emails, filenames = seed(os.environ['DOWNLOADS_DIR'], users=args.users,
+                             history_per_user=args.history, downloads_per_user=args.downloads,
+                             favorites_per_user=args.favorites)
+    print(f'Banco populado em {time.perf_counter() - started:.1f}s ({workdir})')
+
+    import app as app_module
+    app = app_module.app
+    app.config['WTF_CSRF_ENABLED'] = False
+
+    bench = Bench(app, emails, filenames, args)
+    results = {}
+    print(f"{'rota':<40} {'n':>5} {'erros':>6} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>8}")
+    # Um único pool para todas as rotas: os clientes de cada thread são reaproveitados
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        bench.login_all(pool)
+        for name, action, expected, count in bench.scenarios():
+            if args.only and args.only not in name:
+                continue
+            result = bench.run_scenario(pool, action, expected, count)
+            results[name] = result
+            print(f"{name:<40} {result['count']:>5} {result['errors']:>6} "
+                  f"{result['p50_ms']:>9} {result['p99_ms']:>9} {result['rps']:>8}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    failed = any(result['errors'] for result in results.values())
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f'⚠️ Regressão: {line}')
+        failed = failed or bool(regressions)
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
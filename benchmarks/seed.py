@@ -0,0 +1,107 @@
+"""Popula o banco com dados sintéticos em volume para os benchmarks"""
+import os
+import random
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from benchmarks.fake_ytdlp import write_audio
+from database import get_db, init_db, rebuild_play_stats
+
+PASSWORD = 'bench123'
+BATCH_SIZE = 5000
+
+
+def _batched(cursor, sql, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            cursor.executemany(sql, batch)
+            batch.clear()
+    if batch:
+        cursor.executemany(sql, batch)
+
+
+def seed(downloads_dir, users=50, history_per_user=2000, downloads_per_user=100,
+         favorites_per_user=50, audio_files=20, seed_value=42):
+    """Cria usuários, histórico, downloads e favoritos sintéticos.
+
+    As linhas de downloads apontam para um conjunto pequeno de arquivos de
+    áudio reais, compartilhados entre os usuários. Retorna os emails criados
+    e os nomes dos arquivos.
+    """
+    rng = random.Random(seed_value)
+    init_db()
+    os.makedirs(downloads_dir, exist_ok=True)
+
+    filenames = []
+    for i in range(audio_files):
+        filename = f'Faixa Sintetica seed-{i}.mp3'
+        path = os.path.join(downloads_dir, filename)
+        if not os.path.exists(path):
+            write_audio(path, frequency=220.0 + 20 * i)
+        filenames.append(filename)
+
+    conn = get_db()
+    cursor = conn.cursor()
+
+    # Um único hash para todos: gerar scrypt por usuário dominaria o seed
+    password_hash = generate_password_hash(PASSWORD)
+    emails = [f'bench{i}@example.com' for i in range(users)]
+    cursor.executemany('''
+        INSERT OR IGNORE INTO users (username, email, password_hash)
+        VALUES (?, ?, ?)
+    ''', [(f'bench{i}', email, password_hash) for i, email in enumerate(emails)])
+
+    placeholders = ', '.join('?' for _ in emails)
+    cursor.execute(f'SELECT id FROM users WHERE email IN ({placeholders})', emails)
+    user_ids = [row['id'] for row in cursor.fetchall()]
+
+    start = datetime(2025, 1, 1)
+
+    def timestamp():
+        return (start + timedelta(seconds=rng.randint(0, 300 * 86400))).strftime('%Y-%m-%d %H:%M:%S')
+
+    def video_id():
+        return f'vid{rng.randint(0, 5000):05d}'
+
+    def history_rows():
+        for user_id in user_ids:
+            for _ in range(history_per_user):
+                vid = video_id()
+                yield (user_id, f'Video {vid}', f'https://www.youtube.com/watch?v={vid}', vid,
+                       None, f'https://img.youtube.com/vi/{vid}/mqdefault.jpg', timestamp())
+
+    def download_rows():
+        for user_id in user_ids:
+            for _ in range(downloads_per_user):
+                filename = rng.choice(filenames)
+                vid = video_id()
+                yield (user_id, filename[:-4], f'https://www.youtube.com/watch?v={vid}', filename, timestamp())
+
+    def favorite_rows():
+        for user_id in user_ids:
+            for _ in range(favorites_per_user):
+                vid = video_id()
+                yield (user_id, f'Video {vid}', f'https://www.youtube.com/watch?v={vid}', vid,
+                       None, None, timestamp())
+
+    _batched(cursor, '''
+        INSERT INTO history (user_id, title, youtube_url, video_id, playlist_id, thumbnail, played_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', history_rows())
+    _batched(cursor, '''
+        INSERT INTO downloads (user_id, title, youtube_url, filename, downloaded_at)
+        VALUES (?, ?, ?, ?, ?)
+    ''', download_rows())
+    _batched(cursor, '''
+        INSERT INTO favorites (user_id, title, youtube_url, video_id, playlist_id, thumbnail, added_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', favorite_rows())
+    # Histórico inserido direto na tabela: estatísticas derivadas calculadas de uma vez
+    rebuild_play_stats(cursor)
+
+    conn.commit()
+    conn.close()
+    return emails, filenames
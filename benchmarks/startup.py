@@ -0,0 +1,103 @@
+"""Benchmark de inicialização do app (cold start).
+
+Cada rodada sobe um interpretador novo, como um worker do gunicorn após um
+deploy, e mede a importação do app.py e a primeira resposta de /healthz e de
+/login. O tempo total do processo inclui a partida do próprio Python.
+
+Uso:
+    python -m benchmarks.startup --runs 10
+    python -m benchmarks.startup --eager   # sem LAZY_INIT, como em `python app.py`
+    python -m benchmarks.startup --json inicio.json --baseline anterior.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.run import compare, percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executado no processo novo; imprime os tempos (s) em JSON
+CHILD = '''
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+assert client.get('/healthz').status_code == 200
+healthz = time.perf_counter()
+assert client.get('/login').status_code == 200
+login = time.perf_counter()
+print(json.dumps({
+    'import app': imported - started,
+    'primeira resposta /healthz': healthz - started,
+    'primeira resposta /login': login - started,
+}))
+'''
+
+
+def run_once(env):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', CHILD], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['processo completo'] = time.perf_counter() - started
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de inicialização do YouTube Background Player')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--eager', action='store_true', help='Prepara o banco na importação (sem LAZY_INIT)')
+    parser.add_argument('--json', help='Grava os resultados neste arquivo')
+    parser.add_argument('--baseline', help='Resultados anteriores para detectar regressões')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='ytbp-startup-')
+    env = dict(os.environ,
+               DATABASE_PATH=os.path.join(workdir, 'database.db'),
+               DOWNLOADS_DIR=os.path.join(workdir, 'downloads'))
+    if args.eager:
+        env.pop('LAZY_INIT', None)
+    else:
+        env['LAZY_INIT'] = '1'
+        # O que o gunicorn.conf.py faz uma vez no processo mestre
+        subprocess.run([sys.executable, '-c', 'from database import prepare; prepare()'],
+                       cwd=ROOT, env=env, check=True, capture_output=True)
+
+    samples = {}
+    for _ in range(args.runs):
+        for name, value in run_once(env).items():
+            samples.setdefault(name, []).append(value)
+
+    results = {}
+    print(f"{'etapa':<30} {'n':>4} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, values in samples.items():
+        results[name] = {
+            'count': len(values),
+            'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+            'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+            'mean_ms': round(sum(values) / len(values) * 1000, 2),
+        }
+        print(f"{name:<30} {len(values):>4} {results[name]['p50_ms']:>9} {results[name]['p99_ms']:>9}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f'⚠️ Regressão: {line}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""Gera os assets estáticos de produção: minifica, adiciona hash ao nome e pré-comprime.
+
+Uso: python build_assets.py
+
+Os arquivos gerados ficam em static/dist/ junto com o manifest.json que o
+app consulta ao montar as URLs de url_for('static', ...).
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+# Arquivos processados (relativos a static/). O service worker fica de fora:
+# ele é servido sem hash em /sw.js para manter o mesmo escopo e URL.
+SOURCES = [
+    'css/style.css',
+    'css/auth.css',
+    'css/admin.css',
+    'js/player.js',
+    'images/favicon.svg',
+    'images/og-image.png',
+]
+
+# Extensões que valem a pena pré-comprimir (imagens PNG já são comprimidas)
+COMPRESSIBLE = {'.css', '.js', '.svg'}
+
+
+def minify_css(source):
+    """Remove comentários e espaços desnecessários de uma folha de estilo"""
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};:,>])\s*', r'\1', source)
+    source = source.replace(';}', '}')
+    return source.strip()
+
+
+def minify_js(source):
+    """Minifica JavaScript com rjsmin quando disponível"""
+    if rjsmin is None:
+        return source
+    return rjsmin.jsmin(source)
+
+
+def build_asset(relpath):
+    """Processa um arquivo e retorna o caminho com hash relativo a static/"""
+    src_path = os.path.join(STATIC_DIR, relpath)
+    name, ext = os.path.splitext(relpath)
+
+    with open(src_path, 'rb') as f:
+        content = f.read()
+
+    if ext == '.css':
+        content = minify_css(content.decode('utf-8')).encode('utf-8')
+    elif ext == '.js':
+        content = minify_js(content.decode('utf-8')).encode('utf-8')
+
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    hashed = f'dist/{name}.{digest}{ext}'
+    out_path = os.path.join(STATIC_DIR, hashed)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+
+    with open(out_path, 'wb') as f:
+        f.write(content)
+
+    if ext in COMPRESSIBLE:
+        with open(out_path + '.gz', 'wb') as f:
+            f.write(gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(out_path + '.br', 'wb') as f:
+                f.write(brotli.compress(content, quality=11))
+
+    return hashed
+
+
+def build():
+    """Regera static/dist/ do zero e escreve o manifest"""
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    os.makedirs(DIST_DIR)
+
+    manifest = {}
+    for relpath in SOURCES:
+        manifest[relpath] = build_asset(relpath)
+        print(f'{relpath} -> {manifest[relpath]}')
+
+    with open(MANIFEST_PATH, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    if brotli is None:
+        print('⚠️ Módulo brotli não instalado: apenas variantes .gz foram geradas.')
+    if rjsmin is None:
+        print('⚠️ Módulo rjsmin não instalado: JavaScript copiado sem minificação.')
+
+    return manifest
+
+
+if __name__ == '__main__':
+    build()
@@ -4,19 +4,31 @@ import os
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 
-DATABASE_PATH = os.path.join(os.getcwd(), 'database.db')
+# Raiz de armazenamento compartilhada entre instâncias (banco e downloads)
+STORAGE_ROOT = os.environ.get('STORAGE_ROOT')
+
+DATABASE_PATH = os.environ.get('DATABASE_PATH') or os.path.join(STORAGE_ROOT or os.getcwd(), 'database.db')
+
+# Espera (ms) por um lock de escrita de outro processo antes de falhar
+BUSY_TIMEOUT = 5000
 
 def get_db():
     """Conecta ao banco de dados SQLite"""
     conn = sqlite3.connect(DATABASE_PATH)
     conn.row_factory = sqlite3.Row
+    conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT}')
     return conn
 
 def init_db():
     """Inicializa o banco de dados com as tabelas necessárias"""
+    if os.path.dirname(DATABASE_PATH):
+        os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
     conn = get_db()
     cursor = conn.cursor()
     
+    # WAL permite leituras de outros processos durante uma escrita
+    cursor.execute('PRAGMA journal_mode = WAL')
+    
     # Tabela de usuários
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -88,6 +100,106 @@ def init_db():
         )
     ''')
     
+    # Análise de áudio feita na ingestão (loudness e forma de onda)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS track_analysis (
+            filename TEXT PRIMARY KEY,
+            loudness REAL,
+            replay_gain REAL,
+            peak REAL,
+            duration REAL,
+            waveform TEXT,
+            analyzed_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Índice de conteúdo dos arquivos de áudio (deduplicação na ingestão)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS audio_files (
+            content_hash TEXT PRIMARY KEY,
+            filename TEXT NOT NULL,
+            size INTEGER,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Vídeo do YouTube -> áudio já baixado (evita baixar e converter de novo)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS audio_sources (
+            video_id TEXT PRIMARY KEY,
+            content_hash TEXT NOT NULL
+        )
+    ''')
+    
+    # Faixas de cada playlist baixada, na ordem da playlist (para o ZIP da playlist)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS playlist_tracks (
+            user_id INTEGER NOT NULL,
+            playlist_url TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            filename TEXT NOT NULL,
+            PRIMARY KEY (user_id, playlist_url, position)
+        )
+    ''')
+    
+    # Índices das consultas por usuário
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_downloads_user ON downloads (user_id, filename)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_downloads_filename ON downloads (filename)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_audio_files_filename ON audio_files (filename)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_history_user ON history (user_id, played_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_favorites_user ON favorites (user_id, youtube_url)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_playlists_user ON playlists (user_id, youtube_url)')
+    
+    # Estatísticas de reprodução derivadas do histórico, mantidas a cada inserção
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'play_stats'")
+    play_stats_created = cursor.fetchone() is None
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS play_stats (
+            user_id INTEGER NOT NULL,
+            track_key TEXT NOT NULL,
+            title TEXT,
+            youtube_url TEXT NOT NULL,
+            video_id TEXT,
+            playlist_id TEXT,
+            thumbnail TEXT,
+            play_count INTEGER NOT NULL DEFAULT 0,
+            last_played TEXT,
+            -- Ordem da última reprodução: id da linha do histórico (maior = mais recente)
+            last_seq INTEGER NOT NULL,
+            PRIMARY KEY (user_id, track_key)
+        )
+    ''')
+    
+    # Quantas vezes uma faixa foi tocada logo depois de outra ("tocadas em seguida")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS play_transitions (
+            user_id INTEGER NOT NULL,
+            from_key TEXT NOT NULL,
+            to_key TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            last_seq INTEGER NOT NULL,
+            PRIMARY KEY (user_id, from_key, to_key)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_play_stats_recent ON play_stats (user_id, last_seq)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_play_stats_top ON play_stats (user_id, play_count, last_seq)')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_play_transitions_from
+        ON play_transitions (user_id, from_key, count, last_seq)
+    ''')
+    if play_stats_created:
+        rebuild_play_stats(cursor)
+    
+    # Versões das listas de cada usuário (usadas como ETag pelo cliente)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS list_versions (
+            user_id INTEGER NOT NULL,
+            list_name TEXT NOT NULL,
+            version INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, list_name)
+        )
+    ''')
+    
     conn.commit()
     
     # Criar usuário admin padrão se não existir
@@ -102,6 +214,116 @@ def init_db():
     
     conn.close()
 
+def prepare():
+    """Preparação única antes de atender requisições: avisa sobre disco temporário e cria o esquema"""
+    if not STORAGE_ROOT:
+        print("⚠️ Usando armazenamento temporário. Downloads serão perdidos no redeploy.")
+    init_db()
+
+def get_list_version(user_id, list_name):
+    """Retorna a versão atual de uma lista do usuário"""
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT version FROM list_versions WHERE user_id = ? AND list_name = ?',
+                  (user_id, list_name))
+    row = cursor.fetchone()
+    conn.close()
+    return row['version'] if row else 0
+
+def bump_list_version(cursor, user_id, list_name):
+    """Incrementa a versão de uma lista na mesma transação da alteração"""
+    cursor.execute('''
+        INSERT INTO list_versions (user_id, list_name, version)
+        VALUES (?, ?, 1)
+        ON CONFLICT (user_id, list_name) DO UPDATE SET version = version + 1
+    ''', (user_id, list_name))
+
+def track_key(youtube_url, video_id=None):
+    """Identifica a faixa nas estatísticas: o id do vídeo, ou a URL quando não há"""
+    return video_id or youtube_url
+
+def record_play(cursor, user_id, history_id, title, youtube_url, video_id=None,
+                playlist_id=None, thumbnail=None):
+    """Atualiza as estatísticas com uma reprodução recém-inserida no histórico"""
+    key = track_key(youtube_url, video_id)
+
+    # Faixa tocada imediatamente antes, para as sugestões de "tocadas em seguida"
+    cursor.execute('''
+        SELECT track_key FROM play_stats
+        WHERE user_id = ?
+        ORDER BY last_seq DESC
+        LIMIT 1
+    ''', (user_id,))
+    previous = cursor.fetchone()
+
+    cursor.execute('''
+        INSERT INTO play_stats (user_id, track_key, title, youtube_url, video_id, playlist_id,
+                                thumbnail, play_count, last_played, last_seq)
+        VALUES (?, ?, ?, ?, ?, ?, ?, 1, CURRENT_TIMESTAMP, ?)
+        ON CONFLICT (user_id, track_key) DO UPDATE SET
+            title = excluded.title,
+            youtube_url = excluded.youtube_url,
+            video_id = excluded.video_id,
+            playlist_id = excluded.playlist_id,
+            thumbnail = excluded.thumbnail,
+            play_count = play_count + 1,
+            last_played = excluded.last_played,
+            last_seq = excluded.last_seq
+    ''', (user_id, key, title, youtube_url, video_id, playlist_id, thumbnail, history_id))
+
+    if previous and previous['track_key'] != key:
+        cursor.execute('''
+            INSERT INTO play_transitions (user_id, from_key, to_key, count, last_seq)
+            VALUES (?, ?, ?, 1, ?)
+            ON CONFLICT (user_id, from_key, to_key) DO UPDATE SET
+                count = count + 1,
+                last_seq = excluded.last_seq
+        ''', (user_id, previous['track_key'], key, history_id))
+
+def clear_play_stats(cursor, user_id):
+    cursor.execute('DELETE FROM play_stats WHERE user_id = ?', (user_id,))
+    cursor.execute('DELETE FROM play_transitions WHERE user_id = ?', (user_id,))
+
+def rebuild_play_stats(cursor, user_id=None):
+    """Recalcula as estatísticas a partir do histórico (criação das tabelas e importações)"""
+    if user_id is None:
+        cursor.execute('DELETE FROM play_stats')
+        cursor.execute('DELETE FROM play_transitions')
+        where, params = '', ()
+    else:
+        clear_play_stats(cursor, user_id)
+        where, params = 'WHERE user_id = ?', (user_id,)
+
+    # Reproduções em ordem cronológica; seq nunca passa do maior id do histórico,
+    # então reproduções novas (ordenadas pelo id) continuam vindo depois
+    ordered = f'''
+        SELECT id, user_id, title, youtube_url, video_id, playlist_id, thumbnail, played_at,
+               COALESCE(NULLIF(video_id, ''), youtube_url) AS key,
+               ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY played_at, id) AS seq
+        FROM history {where}
+    '''
+
+    # Colunas sem agregação vêm da linha de MAX(seq), ou seja, da reprodução mais recente
+    cursor.execute(f'''
+        INSERT INTO play_stats (user_id, track_key, title, youtube_url, video_id, playlist_id,
+                                thumbnail, play_count, last_played, last_seq)
+        SELECT user_id, key, title, youtube_url, video_id, playlist_id, thumbnail,
+               COUNT(*), played_at, MAX(seq)
+        FROM ({ordered})
+        GROUP BY user_id, key
+    ''', params)
+    cursor.execute(f'''
+        INSERT INTO play_transitions (user_id, from_key, to_key, count, last_seq)
+        SELECT user_id, from_key, to_key, COUNT(*), MAX(seq)
+        FROM (
+            SELECT user_id, seq, key AS to_key,
+                   LAG(key) OVER (PARTITION BY user_id ORDER BY seq) AS from_key
+            FROM ({ordered})
+        )
+        WHERE from_key IS NOT NULL AND from_key != to_key
+        GROUP BY user_id, from_key, to_key
+    ''', params)
+
 class User:
     def __init__(self, id, username, email, password_hash, is_admin, created_at, last_login):
         self.id = id
@@ -195,6 +417,9 @@ class User:
         cursor.execute('DELETE FROM history WHERE user_id = ?', (self.id,))
         cursor.execute('DELETE FROM favorites WHERE user_id = ?', (self.id,))
         cursor.execute('DELETE FROM playlists WHERE user_id = ?', (self.id,))
+        cursor.execute('DELETE FROM playlist_tracks WHERE user_id = ?', (self.id,))
+        clear_play_stats(cursor, self.id)
+        cursor.execute('DELETE FROM list_versions WHERE user_id = ?', (self.id,))
         cursor.execute('DELETE FROM users WHERE id = ?', (self.id,))
         conn.commit()
         conn.close()
@@ -0,0 +1,108 @@
+"""Índice de conteúdo da biblioteca: cada áudio é guardado uma única vez.
+
+Ao fim de cada download o MP3 é identificado pelo SHA-256 do conteúdo. Se
+o mesmo áudio já existe com outro nome, o arquivo novo é descartado e os
+registros de download passam a referenciar o existente. O id do vídeo de
+origem também é indexado, o que permite pular o download e a conversão de
+vídeos cujo áudio já está na biblioteca.
+"""
+import hashlib
+import os
+import re
+
+from database import get_db
+
+CHUNK_SIZE = 64 * 1024
+
+# Id do vídeo em URLs do YouTube (watch?v=, youtu.be/, shorts/)
+_VIDEO_ID = re.compile(r'(?:[?&]v=|youtu\.be/|/shorts/)([\w-]{11})')
+
+
+def file_sha256(path):
+    """Calcula o SHA-256 de um arquivo lendo em pedaços"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def video_id_from_url(url):
+    """Id do vídeo do YouTube presente na URL, ou None"""
+    match = _VIDEO_ID.search(url or '')
+    return match.group(1) if match else None
+
+
+def lookup_hash(downloads_dir, content_hash):
+    """Arquivo da biblioteca com este conteúdo, ou None se não há (ou sumiu do disco)"""
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT filename FROM audio_files WHERE content_hash = ?', (content_hash,))
+    row = cursor.fetchone()
+    conn.close()
+    if row and os.path.isfile(os.path.join(downloads_dir, row['filename'])):
+        return row['filename']
+    return None
+
+
+def lookup_source(downloads_dir, video_id):
+    """Arquivo já baixado para o vídeo, ou None se não há (ou sumiu do disco)"""
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT f.filename FROM audio_sources s
+        JOIN audio_files f ON f.content_hash = s.content_hash
+        WHERE s.video_id = ?
+    ''', (video_id,))
+    row = cursor.fetchone()
+    conn.close()
+    if row and os.path.isfile(os.path.join(downloads_dir, row['filename'])):
+        return row['filename']
+    return None
+
+
+def register(downloads_dir, path, video_id=None, content_hash=None):
+    """Indexa um arquivo recém-gravado e retorna o nome com que ele fica na biblioteca"""
+    content_hash = content_hash or file_sha256(path)
+    filename = os.path.basename(path)
+
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('SELECT filename FROM audio_files WHERE content_hash = ?', (content_hash,))
+    row = cursor.fetchone()
+
+    if row and row['filename'] != filename and os.path.isfile(os.path.join(downloads_dir, row['filename'])):
+        # Mesmo áudio já armazenado: o novo arquivo é só uma cópia
+        os.remove(path)
+        filename = row['filename']
+    else:
+        cursor.execute('''
+            INSERT OR REPLACE INTO audio_files (content_hash, filename, size)
+            VALUES (?, ?, ?)
+        ''', (content_hash, filename, os.path.getsize(path)))
+
+    if video_id:
+        cursor.execute('''
+            INSERT OR REPLACE INTO audio_sources (video_id, content_hash)
+            VALUES (?, ?)
+        ''', (video_id, content_hash))
+    conn.commit()
+    conn.close()
+    return filename
+
+
+def forget(filename):
+    """Remove do índice um arquivo que foi apagado do disco"""
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        DELETE FROM audio_sources WHERE content_hash IN (
+            SELECT content_hash FROM audio_files WHERE filename = ?
+        )
+    ''', (filename,))
+    cursor.execute('DELETE FROM audio_files WHERE filename = ?', (filename,))
+    conn.commit()
+    conn.close()
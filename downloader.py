@@ -0,0 +1,258 @@
+"""Tarefas de download de áudio do YouTube executadas pelo pool de jobs"""
+import os
+
+import analysis
+import dedup
+import events
+import jobs
+from database import STORAGE_ROOT, get_db, bump_list_version
+
+# Configuração de armazenamento: temporário no Render, compartilhado com STORAGE_ROOT
+DOWNLOADS_DIR = os.environ.get('DOWNLOADS_DIR') or (
+    os.path.join(STORAGE_ROOT, 'downloads') if STORAGE_ROOT else '/tmp/downloads')
+
+# Variação mínima (em %) entre dois eventos de progresso do mesmo job
+PROGRESS_STEP = 5
+
+
+def _skip_known(seen):
+    """match_filter do yt-dlp que pula vídeos cujo áudio já está na biblioteca.
+
+    Registra em seen, na ordem em que aparecem, todos os vídeos avaliados.
+    """
+    def match_filter(info, *, incomplete=False):
+        video_id = info.get('id')
+        if not video_id:
+            return None
+        item = seen.setdefault(video_id, {
+            'filename': dedup.lookup_source(DOWNLOADS_DIR, video_id),
+            'title': None,
+            'url': None,
+        })
+        item['title'] = info.get('title') or item['title']
+        item['url'] = info.get('webpage_url') or item['url']
+        if item['filename']:
+            return 'Áudio já está na biblioteca'
+        return None
+
+    return match_filter
+
+
+def _youtube_dl(opts):
+    """Cria o YoutubeDL; o yt-dlp só é importado por quem executa downloads"""
+    import yt_dlp
+    return yt_dlp.YoutubeDL(opts)
+
+
+def _output_path(info):
+    """Caminho final do MP3 (após a conversão) de um vídeo baixado"""
+    requested = info.get('requested_downloads') or []
+    if requested and requested[-1].get('filepath'):
+        return requested[-1]['filepath']
+    return info.get('filepath')
+
+
+def _ingest(info, seen):
+    """Indexa os arquivos baixados e retorna as faixas na ordem da extração.
+
+    Cada faixa é um dict com filename, title e url; vídeos pulados pelo
+    match_filter entram com o arquivo que já existia.
+    """
+    entries = (info.get('entries') or []) if info and 'entries' in info else [info]
+    for entry in entries:
+        if not entry or not entry.get('id'):
+            continue
+        path = _output_path(entry)
+        if not path or not os.path.isfile(path):
+            continue
+        item = seen.setdefault(entry['id'], {'filename': None, 'title': None, 'url': None})
+        item['filename'] = dedup.register(DOWNLOADS_DIR, path, entry['id'])
+        item['title'] = entry.get('title') or item['title']
+        item['url'] = entry.get('webpage_url') or item['url']
+
+    return [item for item in seen.values() if item['filename']]
+
+
+def _ydl_opts(job_id, user_id, kind, **extra):
+    """Opções comuns do yt-dlp, com ganchos que publicam o progresso do job"""
+    last = {'percent': -PROGRESS_STEP, 'title': None}
+
+    def progress_hook(d):
+        info = d.get('info_dict') or {}
+        title = info.get('title')
+        if d['status'] == 'downloading':
+            total = d.get('total_bytes') or d.get('total_bytes_estimate')
+            if not total:
+                return
+            percent = int(d.get('downloaded_bytes', 0) * 100 / total)
+            if title == last['title'] and percent - last['percent'] < PROGRESS_STEP:
+                return
+            last['percent'], last['title'] = percent, title
+            events.publish(user_id, 'job', {
+                'job_id': job_id,
+                'kind': kind,
+                'status': 'progress',
+                'title': title,
+                'percent': percent,
+                'index': info.get('playlist_index'),
+                'count': info.get('n_entries') or info.get('playlist_count')
+            })
+
+    def postprocessor_hook(d):
+        if d['status'] == 'started' and d.get('postprocessor') == 'ExtractAudio':
+            events.publish(user_id, 'job', {
+                'job_id': job_id,
+                'kind': kind,
+                'status': 'converting',
+                'title': (d.get('info_dict') or {}).get('title')
+            })
+
+    opts = {
+        'format': 'bestaudio/best',
+        # O id no nome evita que vídeos diferentes com o mesmo título se sobrescrevam
+        'outtmpl': os.path.join(DOWNLOADS_DIR, '%(title)s [%(id)s].%(ext)s'),
+        'postprocessors': [{
+            'key': 'FFmpegExtractAudio',
+            'preferredcodec': 'mp3',
+            'preferredquality': '192',
+        }],
+        'keepvideo': False,
+        'progress_hooks': [progress_hook],
+        'postprocessor_hooks': [postprocessor_hook],
+    }
+    opts.update(extra)
+    return opts
+
+
+@jobs.task
+def download_audio(job_id, user_id, youtube_url):
+    """Baixa o áudio de um vídeo para a biblioteca do usuário"""
+    os.makedirs(DOWNLOADS_DIR, exist_ok=True)
+
+    seen = {}
+    ydl_opts = _ydl_opts(job_id, user_id, 'download_audio', quiet=True, no_warnings=True,
+                         match_filter=_skip_known(seen))
+    with _youtube_dl(ydl_opts) as ydl:
+        info = ydl.extract_info(youtube_url, download=True)
+
+    tracks = _ingest(info, seen)
+    if not tracks:
+        raise RuntimeError('Não foi possível baixar o áudio')
+    track = tracks[0]
+    title = track['title'] or (info or {}).get('title') or 'audio'
+    filename = track['filename']
+
+    # Registrar no banco de dados, se a música (pelo nome do índice de conteúdo)
+    # ainda não está na biblioteca: outra URL do mesmo vídeo não a duplica
+    conn = get_db()
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT id FROM downloads
+        WHERE user_id = ? AND filename = ?
+    ''', (user_id, filename))
+    added = cursor.fetchone() is None
+    if added:
+        cursor.execute('''
+            INSERT INTO downloads (user_id, title, youtube_url, filename)
+            VALUES (?, ?, ?, ?)
+        ''', (user_id, title, youtube_url, filename))
+        bump_list_version(cursor, user_id, 'library')
+        conn.commit()
+    conn.close()
+
+    if added:
+        events.publish(user_id, 'list', {'name': 'library'})
+        jobs.submit('analyze_track', user_id, filename=filename)
+    events.publish(user_id, 'job', {
+        'job_id': job_id,
+        'kind': 'download_audio',
+        'status': 'done',
+        'title': title,
+        'filename': filename
+    })
+
+
+@jobs.task
+def download_playlist(job_id, user_id, youtube_url):
+    """Baixa todas as músicas de uma playlist para a biblioteca do usuário"""
+    os.makedirs(DOWNLOADS_DIR, exist_ok=True)
+
+    seen = {}
+    ydl_opts = _ydl_opts(job_id, user_id, 'download_playlist', quiet=False, ignoreerrors=True,
+                         match_filter=_skip_known(seen))
+    with _youtube_dl(ydl_opts) as ydl:
+        info = ydl.extract_info(youtube_url, download=True)
+
+    conn = get_db()
+    cursor = conn.cursor()
+    added = []
+    tracks = []
+
+    for track in _ingest(info, seen):
+        filename = track['filename']
+        tracks.append(filename)
+
+        # Verificar se já existe para evitar duplicatas (o nome vem do índice de conteúdo)
+        cursor.execute('''
+            SELECT id FROM downloads
+            WHERE user_id = ? AND filename = ?
+        ''', (user_id, filename))
+
+        if not cursor.fetchone() and filename not in added:
+            cursor.execute('''
+                INSERT INTO downloads (user_id, title, youtube_url, filename)
+                VALUES (?, ?, ?, ?)
+            ''', (user_id, track['title'] or 'Unknown', track['url'] or youtube_url, filename))
+            added.append(filename)
+
+    # Composição atual da playlist, incluindo faixas que já estavam na biblioteca
+    cursor.execute('DELETE FROM playlist_tracks WHERE user_id = ? AND playlist_url = ?',
+                   (user_id, youtube_url))
+    cursor.executemany('''
+        INSERT INTO playlist_tracks (user_id, playlist_url, position, filename)
+        VALUES (?, ?, ?, ?)
+    ''', [(user_id, youtube_url, position, filename) for position, filename in enumerate(tracks, 1)])
+
+    count = len(added)
+    if count:
+        bump_list_version(cursor, user_id, 'library')
+    conn.commit()
+    conn.close()
+
+    if count:
+        events.publish(user_id, 'list', {'name': 'library'})
+    for filename in added:
+        jobs.submit('analyze_track', user_id, filename=filename)
+    events.publish(user_id, 'job', {
+        'job_id': job_id,
+        'kind': 'download_playlist',
+        'status': 'done',
+        'total': count,
+        'youtube_url': youtube_url,
+        'message': f'{count} músicas baixadas com sucesso!'
+    })
+
+
+@jobs.task
+def analyze_track(job_id, user_id, filename):
+    """Calcula loudness e forma de onda de uma faixa da biblioteca"""
+    # Áudio deduplicado pode já ter sido analisado por outro download
+    if analysis.get_analysis(filename) is not None or not analysis.claim(filename):
+        return
+    try:
+        path = os.path.join(DOWNLOADS_DIR, filename)
+        if not os.path.isfile(path):
+            return
+        import loudness
+        try:
+            result = loudness.analyze_file(path)
+        except RuntimeError as e:
+            # FFmpeg não conseguiu decodificar o arquivo (FFmpeg ausente continua sendo erro do job)
+            print(f"⚠️ Falha ao analisar '{filename}': {e}")
+            analysis.save_failure(filename)
+            return
+        analysis.save_analysis(filename, result)
+    finally:
+        analysis.release(filename)
+
+    events.publish(user_id, 'analysis', {'filename': filename})
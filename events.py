@@ -0,0 +1,142 @@
+"""Canal de eventos por usuário entregue ao navegador via Server-Sent Events"""
+import json
+import os
+import queue
+import threading
+
+# Mensagens acumuladas por conexão antes de descartar as mais novas
+SUBSCRIBER_QUEUE_SIZE = 256
+
+# Intervalo (s) entre comentários de keep-alive na conexão SSE
+HEARTBEAT_INTERVAL = 15
+
+# Conexões SSE simultâneas por processo. Cada uma ocupa uma thread do gunicorn
+# enquanto está aberta, então o limite deve ficar abaixo de --threads para
+# sobrar threads para as demais requisições (inclusive /healthz)
+MAX_STREAMS = int(os.environ.get('SSE_MAX_CONNECTIONS', '16'))
+
+_stream_slots = threading.BoundedSemaphore(MAX_STREAMS)
+
+
+class LocalBroker:
+    """Pub/sub em memória, válido apenas dentro de um processo"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def publish(self, user_id, message):
+        with self._lock:
+            targets = list(self._subscribers.get(user_id, ()))
+        for q in targets:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                pass
+
+    def subscribe(self, user_id):
+        q = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(q)
+
+        broker = self
+
+        class Subscription:
+            def get(self, timeout):
+                try:
+                    return q.get(timeout=timeout)
+                except queue.Empty:
+                    return None
+
+            def close(self):
+                with broker._lock:
+                    subscribers = broker._subscribers.get(user_id)
+                    if subscribers is not None:
+                        subscribers.discard(q)
+                        if not subscribers:
+                            del broker._subscribers[user_id]
+
+        return Subscription()
+
+
+class RedisBroker:
+    """Pub/sub via Redis, compartilhado entre vários workers e instâncias"""
+
+    def __init__(self, url):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+
+    @staticmethod
+    def _channel(user_id):
+        return f'ytbp:events:{user_id}'
+
+    def publish(self, user_id, message):
+        self._redis.publish(self._channel(user_id), message)
+
+    def subscribe(self, user_id):
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self._channel(user_id))
+
+        class Subscription:
+            def get(self, timeout):
+                item = pubsub.get_message(timeout=timeout)
+                if item is None:
+                    return None
+                data = item['data']
+                return data.decode('utf-8') if isinstance(data, bytes) else data
+
+            def close(self):
+                pubsub.close()
+
+        return Subscription()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Retorna o broker configurado (EVENTS_BROKER_URL/REDIS_URL para vários workers)"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                url = os.environ.get('EVENTS_BROKER_URL') or os.environ.get('REDIS_URL')
+                _broker = RedisBroker(url) if url else LocalBroker()
+    return _broker
+
+
+def publish(user_id, event, data=None):
+    """Publica um evento para todas as conexões abertas do usuário"""
+    message = json.dumps({'event': event, 'data': data or {}})
+    try:
+        get_broker().publish(user_id, message)
+    except Exception as e:
+        # Falha ao notificar não deve derrubar a operação que gerou o evento
+        print(f"⚠️ Erro ao publicar evento '{event}': {e}")
+
+
+def open_slot():
+    """Reserva uma vaga de conexão SSE; False quando o limite do processo foi atingido"""
+    return _stream_slots.acquire(blocking=False)
+
+
+def close_slot():
+    """Libera a vaga reservada por open_slot (ao fechar a resposta)"""
+    _stream_slots.release()
+
+
+def stream(user_id):
+    """Gera o corpo text/event-stream de uma conexão SSE do usuário"""
+    subscription = get_broker().subscribe(user_id)
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            message = subscription.get(timeout=HEARTBEAT_INTERVAL)
+            if message is None:
+                yield ': ping\n\n'
+                continue
+            payload = json.loads(message)
+            yield f"event: {payload['event']}\ndata: {json.dumps(payload['data'])}\n\n"
+    finally:
+        subscription.close()
@@ -0,0 +1,14 @@
+"""Configuração do gunicorn (carregada automaticamente a partir da raiz do projeto).
+
+O esquema do banco é preparado uma única vez no processo mestre, antes de
+criar os workers; os workers importam o app em modo LAZY_INIT e sobem sem
+repetir essa etapa.
+"""
+import os
+
+os.environ.setdefault('LAZY_INIT', '1')
+
+
+def on_starting(server):
+    from database import prepare
+    prepare()
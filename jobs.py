@@ -0,0 +1,115 @@
+"""Execução de tarefas longas (downloads) fora do ciclo da requisição.
+
+Por padrão os jobs rodam num pool de threads do próprio processo. Com
+JOBS_BROKER_URL (ou REDIS_URL) definido, os jobs vão para uma fila no
+Redis compartilhada entre as instâncias e são executados por worker.py.
+"""
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import events
+
+# Tarefas registradas com @task, acessíveis pelo nome
+TASKS = {}
+
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+
+QUEUE_KEY = 'ytbp:jobs'
+
+# Espera (s) entre tentativas quando o Redis não responde; dobra até o máximo
+RETRY_MIN_DELAY = 1
+RETRY_MAX_DELAY = 30
+
+
+class LocalQueue:
+    """Pool de threads dentro do processo (uma única instância)"""
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='job')
+
+    def push(self, job):
+        self._executor.submit(run, job['job_id'], job['name'], job['user_id'], job['kwargs'])
+
+
+class RedisQueue:
+    """Fila no Redis consumida pelos workers de qualquer instância"""
+
+    def __init__(self, url):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+
+    def push(self, job):
+        self._redis.rpush(QUEUE_KEY, json.dumps(job))
+
+    def pop(self, timeout=5):
+        item = self._redis.blpop([QUEUE_KEY], timeout=timeout)
+        if item is None:
+            return None
+        return json.loads(item[1])
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    """Retorna a fila configurada (JOBS_BROKER_URL/REDIS_URL para a fila compartilhada)"""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                url = os.environ.get('JOBS_BROKER_URL') or os.environ.get('REDIS_URL')
+                _queue = RedisQueue(url) if url else LocalQueue()
+    return _queue
+
+
+def task(fn):
+    """Registra uma função como tarefa em segundo plano"""
+    TASKS[fn.__name__] = fn
+    return fn
+
+
+def submit(name, user_id, **kwargs):
+    """Agenda a tarefa e retorna o id do job; o progresso chega ao usuário via eventos"""
+    job_id = uuid.uuid4().hex
+    get_queue().push({'job_id': job_id, 'name': name, 'user_id': user_id, 'kwargs': kwargs})
+    return job_id
+
+
+def run(job_id, name, user_id, kwargs):
+    """Executa uma tarefa, avisando o usuário caso ela falhe"""
+    try:
+        TASKS[name](job_id=job_id, user_id=user_id, **kwargs)
+    except Exception as e:
+        events.publish(user_id, 'job', {
+            'job_id': job_id,
+            'kind': name,
+            'status': 'error',
+            'error': str(e)
+        })
+
+
+def work(stop=None):
+    """Consome a fila compartilhada até stop ser sinalizado (usado por worker.py)"""
+    queue = get_queue()
+    if not isinstance(queue, RedisQueue):
+        raise RuntimeError('Defina JOBS_BROKER_URL ou REDIS_URL para usar a fila compartilhada')
+
+    import redis
+    stop = stop or threading.Event()
+    delay = RETRY_MIN_DELAY
+    while not stop.is_set():
+        try:
+            job = queue.pop()
+        except redis.RedisError as e:
+            # Redis fora do ar: espera e tenta de novo, sem derrubar a thread
+            print(f'⚠️ Erro ao ler a fila de jobs: {e}; nova tentativa em {delay}s')
+            stop.wait(delay)
+            delay = min(delay * 2, RETRY_MAX_DELAY)
+            continue
+        delay = RETRY_MIN_DELAY
+        if job is not None:
+            run(job['job_id'], job['name'], job['user_id'], job['kwargs'])
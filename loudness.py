@@ -0,0 +1,133 @@
+"""Medição de loudness (EBU R128 / ReplayGain) e forma de onda de uma faixa.
+
+O MP3 é decodificado pelo FFmpeg em PCM e processado em blocos com NumPy,
+sem carregar a faixa inteira em memória. O filtro de ponderação K da
+ITU-R BS.1770 usa scipy.signal quando disponível; sem ele a loudness é
+medida sem ponderação (aproximação).
+"""
+import subprocess
+
+import numpy as np
+
+try:
+    from scipy.signal import lfilter, lfilter_zi
+except ImportError:
+    lfilter = None
+
+SAMPLE_RATE = 48000
+CHANNELS = 2
+
+# Sub-blocos de 100 ms: quatro formam um bloco de 400 ms com 75% de sobreposição
+SUB_BLOCK = SAMPLE_RATE // 10
+CHUNK_FRAMES = SUB_BLOCK * 100
+
+# Pontos da forma de onda enviada ao cliente
+WAVEFORM_POINTS = 400
+
+# Referência do ReplayGain 2.0
+REPLAYGAIN_REFERENCE = -18.0
+
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+
+# Ponderação K (BS.1770) a 48 kHz: filtro shelving seguido do passa-altas RLB
+_K_B = np.convolve([1.53512485958697, -2.69169618940638, 1.19839281085285],
+                   [1.0, -2.0, 1.0])
+_K_A = np.convolve([1.0, -1.69065929318241, 0.73248077421585],
+                   [1.0, -1.99004745483398, 0.99007225036621])
+
+
+def _iter_pcm(path):
+    """Decodifica o arquivo com FFmpeg e gera blocos float32 (frames x canais)"""
+    process = subprocess.Popen(
+        ['ffmpeg', '-v', 'error', '-i', path, '-f', 's16le',
+         '-ac', str(CHANNELS), '-ar', str(SAMPLE_RATE), '-'],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    frame_bytes = 2 * CHANNELS
+    try:
+        while True:
+            data = process.stdout.read(CHUNK_FRAMES * frame_bytes)
+            if not data:
+                break
+            usable = len(data) - len(data) % frame_bytes
+            samples = np.frombuffer(data[:usable], dtype='<i2').reshape(-1, CHANNELS)
+            yield samples.astype(np.float32) / 32768.0
+    finally:
+        process.stdout.close()
+        stderr = process.stderr.read()
+        process.stderr.close()
+        if process.wait() != 0:
+            raise RuntimeError(f'FFmpeg falhou: {stderr.decode(errors="replace").strip()}')
+
+
+def integrated_loudness(energies):
+    """Loudness integrada (LUFS) a partir das energias médias dos sub-blocos de 100 ms"""
+    if len(energies) < 4:
+        return None
+    blocks = np.convolve(energies, np.ones(4) / 4, mode='valid')
+    with np.errstate(divide='ignore'):
+        loudness = -0.691 + 10 * np.log10(blocks)
+
+    gated = blocks[loudness > ABSOLUTE_GATE]
+    if not len(gated):
+        return None
+    relative = -0.691 + 10 * np.log10(gated.mean()) + RELATIVE_GATE
+    gated = blocks[(loudness > ABSOLUTE_GATE) & (loudness > relative)]
+    if not len(gated):
+        return None
+    return float(-0.691 + 10 * np.log10(gated.mean()))
+
+
+def downsample_peaks(peaks, points=WAVEFORM_POINTS):
+    """Reduz os picos por sub-bloco a um número fixo de pontos (0-100)"""
+    if not len(peaks):
+        return []
+    if len(peaks) > points:
+        edges = np.linspace(0, len(peaks), points, endpoint=False).astype(int)
+        peaks = np.maximum.reduceat(peaks, edges)
+    return np.round(np.clip(peaks, 0, 1) * 100).astype(int).tolist()
+
+
+def analyze_file(path):
+    """Mede loudness, pico e forma de onda de um arquivo de áudio"""
+    energies, peaks = [], []
+    leftover = np.zeros((0, CHANNELS), dtype=np.float32)
+    leftover_raw = leftover
+    zi = None
+    frames = 0
+    peak = 0.0
+
+    for samples in _iter_pcm(path):
+        frames += len(samples)
+        peak = max(peak, float(np.abs(samples).max(initial=0.0)))
+
+        weighted = samples
+        if lfilter is not None:
+            if zi is None:
+                zi = lfilter_zi(_K_B, _K_A)[:, None] * samples[0]
+            weighted, zi = lfilter(_K_B, _K_A, samples, axis=0, zi=zi)
+
+        # Junta com o resto do bloco anterior e processa só sub-blocos completos
+        pending = np.concatenate([leftover, weighted]) if len(leftover) else weighted
+        raw = np.concatenate([leftover_raw, samples]) if len(leftover_raw) else samples
+        complete = len(pending) - len(pending) % SUB_BLOCK
+
+        sub = pending[:complete].reshape(-1, SUB_BLOCK, CHANNELS)
+        energies.append((sub.astype(np.float64) ** 2).mean(axis=1).sum(axis=1))
+        peaks.append(np.abs(raw[:complete].reshape(-1, SUB_BLOCK * CHANNELS)).max(axis=1))
+
+        leftover = pending[complete:]
+        leftover_raw = raw[complete:]
+
+    energies = np.concatenate(energies) if energies else np.zeros(0)
+    peaks = np.concatenate(peaks) if peaks else np.zeros(0)
+
+    loudness = integrated_loudness(energies)
+    return {
+        'loudness': None if loudness is None else round(loudness, 2),
+        'replay_gain': None if loudness is None else round(REPLAYGAIN_REFERENCE - loudness, 2),
+        'peak': round(peak, 4),
+        'duration': round(frames / SAMPLE_RATE, 2),
+        'waveform': downsample_peaks(peaks),
+    }
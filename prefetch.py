@@ -0,0 +1,100 @@
+"""Pré-carregamento das próximas faixas da biblioteca.
+
+Calcula a fila prevista de reprodução (respeitando aleatório e repetição)
+e aquece o cache de páginas do sistema operacional com os arquivos que
+devem tocar em seguida, para que o stream comece sem esperar o disco.
+"""
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Faixas previstas retornadas por padrão e limite aceito na requisição
+QUEUE_SIZE = 3
+MAX_QUEUE_SIZE = 10
+
+# Sem posix_fadvise, lê no máximo este tanto de cada arquivo para aquecê-lo
+WARM_READ_BYTES = 4 * 1024 * 1024
+WARM_CHUNK = 256 * 1024
+
+# Um arquivo aquecido há menos que isso não é aquecido de novo
+WARM_TTL = 300
+WARM_MEMORY = 256
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='prefetch')
+_warmed = {}
+_warmed_lock = threading.Lock()
+
+
+def _shuffle_key(seed, filename):
+    # Hash estável: a mesma semente gera a mesma ordem em qualquer processo
+    return hashlib.sha1(f'{seed}:{filename}'.encode('utf-8')).digest()
+
+
+def play_order(filenames, shuffle=False, seed=''):
+    """Ordem em que a biblioteca é percorrida pelo botão "próxima" """
+    if not shuffle:
+        return list(filenames)
+    return sorted(filenames, key=lambda filename: _shuffle_key(seed, filename))
+
+
+def upcoming(filenames, current=None, shuffle=False, repeat=False, seed='', n=QUEUE_SIZE):
+    """Próximas n faixas previstas a partir da atual.
+
+    Com repetição ligada a faixa atual toca de novo ao terminar, então ela
+    abre a fila; a navegação manual continua pelas seguintes.
+    """
+    order = play_order(filenames, shuffle, seed)
+    if not order or n <= 0:
+        return []
+
+    if current in order:
+        start = order.index(current) + 1
+    else:
+        start = 0
+    result = [order[(start + i) % len(order)] for i in range(min(n, len(order)))]
+    if current in order and len(order) > 1:
+        result = [filename for filename in result if filename != current]
+    if repeat and current in order:
+        result = [current] + result
+    return result[:n]
+
+
+def _warm_file(path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        else:
+            # Plataformas sem fadvise: a leitura traz o início do arquivo para o cache
+            remaining = WARM_READ_BYTES
+            while remaining > 0 and os.read(fd, min(WARM_CHUNK, remaining)):
+                remaining -= WARM_CHUNK
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _should_warm(path, now):
+    with _warmed_lock:
+        last = _warmed.get(path)
+        if last is not None and now - last < WARM_TTL:
+            return False
+        _warmed[path] = now
+        if len(_warmed) > WARM_MEMORY:
+            for old in sorted(_warmed, key=_warmed.get)[:len(_warmed) - WARM_MEMORY]:
+                del _warmed[old]
+        return True
+
+
+def warm(paths):
+    """Agenda o aquecimento do cache de páginas, sem bloquear a requisição"""
+    now = time.monotonic()
+    pending = [path for path in paths if _should_warm(path, now)]
+    for path in pending:
+        _executor.submit(_warm_file, path)
@@ -141,6 +141,9 @@ function onPlayerStateChange(event) {
         } else {
             nextTrack();
         }
+    } else {
+        // Buffering/cued: troca de faixa na playlist, atualiza título e posição
+        updateUI();
     }
 }
 
@@ -215,12 +218,6 @@ function updateUI() {
     btn.textContent = isPlaying ? '⏸️ Pausar' : '▶️ Reproduzir';
 }
 
-setInterval(() => {
-    if (player && isPlaying) {
-        updateUI();
-    }
-}, 2000);
-
 document.addEventListener('keydown', (e) => {
     if (e.target.tagName === 'INPUT') return;
     
@@ -240,6 +237,83 @@ document.addEventListener('keydown', (e) => {
     }
 });
 
+const localCache = (() => {
+    let dbPromise = null;
+
+    function open() {
+        if (!('indexedDB' in window)) return Promise.reject(new Error('IndexedDB indisponível'));
+        if (!dbPromise) {
+            dbPromise = new Promise((resolve, reject) => {
+                const request = indexedDB.open('ytbp', 1);
+                request.onupgradeneeded = () => {
+                    const db = request.result;
+                    db.createObjectStore('lists', { keyPath: 'key' });
+                    db.createObjectStore('pins', { keyPath: 'key' });
+                };
+                request.onsuccess = () => resolve(request.result);
+                request.onerror = () => reject(request.error);
+            });
+        }
+        return dbPromise;
+    }
+
+    async function run(store, mode, action) {
+        const db = await open();
+        return new Promise((resolve, reject) => {
+            const tx = db.transaction(store, mode);
+            const request = action(tx.objectStore(store));
+            tx.oncomplete = () => resolve(request ? request.result : undefined);
+            tx.onerror = () => reject(tx.error);
+        });
+    }
+
+    async function clear() {
+        // A conexão aberta bloquearia a exclusão do banco
+        if (dbPromise) {
+            const db = await dbPromise.catch(() => null);
+            if (db) db.close();
+            dbPromise = null;
+        }
+        if (!('indexedDB' in window)) return;
+        await new Promise((resolve) => {
+            const request = indexedDB.deleteDatabase('ytbp');
+            request.onsuccess = request.onerror = request.onblocked = () => resolve();
+        });
+    }
+
+    return {
+        get: (store, key) => run(store, 'readonly', (os) => os.get(key)).catch(() => undefined),
+        put: (store, value) => run(store, 'readwrite', (os) => os.put(value)).catch(() => undefined),
+        remove: (store, key) => run(store, 'readwrite', (os) => os.delete(key)).catch(() => undefined),
+        clear
+    };
+})();
+
+function cacheKey(name) {
+    return `${document.body.dataset.userId || ''}:${name}`;
+}
+
+// Renderiza a lista salva localmente na hora e revalida com o servidor via ETag
+async function fetchList(name, url, render) {
+    const key = cacheKey(name);
+    const cached = await localCache.get('lists', key);
+    if (cached) render(cached.data, true);
+
+    try {
+        const headers = cached && cached.etag ? { 'If-None-Match': cached.etag } : {};
+        const response = await fetch(url, { headers });
+        if (response.status === 304 && cached) return;
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+
+        const data = await response.json();
+        await localCache.put('lists', { key, etag: response.headers.get('ETag'), data });
+        render(data, false);
+    } catch (error) {
+        if (!cached) throw error;
+        console.warn(`Usando ${name} salvo localmente:`, error);
+    }
+}
+
 function switchTab(tabName) {
     document.querySelectorAll('.tab-btn').forEach(btn => {
         btn.classList.remove('active');
@@ -320,53 +394,55 @@ async function addToFavorites() {
     }
 }
 
-async function downloadAudio() {
-    if (!currentUrl) {
-        showToast('Nenhum vídeo carregado', 'error');
-        return;
-    }
-    
-    showToast('Preparando download... Isso pode levar alguns segundos', 'info');
-    
+// Jobs iniciados por esta aba; o progresso chega pelo canal de eventos
+const pendingJobs = {};
+// Eventos de jobs desconhecidos, guardados só enquanto algum POST de início está em andamento
+let startingJobs = 0;
+let earlyJobEvents = {};
+
+async function startDownloadJob(url, body) {
+    startingJobs++;
     try {
-        const response = await fetch('/api/download-audio', {
+        const response = await fetch(url, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify({
-                youtube_url: currentUrl
-            })
+            body: JSON.stringify(body)
         });
         
+        const data = await response.json();
         if (!response.ok) {
-            const error = await response.json();
-            showToast(error.error || 'Erro ao baixar áudio', 'error');
-            return;
+            throw new Error(data.error || 'Erro ao iniciar download');
         }
         
-        const blob = await response.blob();
-        const url = window.URL.createObjectURL(blob);
-        const a = document.createElement('a');
-        a.style.display = 'none';
-        a.href = url;
+        pendingJobs[data.job_id] = true;
         
-        const contentDisposition = response.headers.get('Content-Disposition');
-        let filename = 'audio.mp3';
-        if (contentDisposition) {
-            const filenameMatch = contentDisposition.match(/filename="?(.+)"?/);
-            if (filenameMatch) filename = filenameMatch[1];
+        // Eventos que chegaram antes da resposta do POST
+        if (earlyJobEvents[data.job_id]) {
+            handleJobEvent(earlyJobEvents[data.job_id]);
+            delete earlyJobEvents[data.job_id];
         }
-        
-        a.download = filename;
-        document.body.appendChild(a);
-        a.click();
-        window.URL.revokeObjectURL(url);
-        document.body.removeChild(a);
-        
-        showToast('Download iniciado! ✓', 'success');
+        return data.job_id;
+    } finally {
+        // Sem POST pendente, o que sobrou é de outras abas ou de análises
+        startingJobs--;
+        if (startingJobs === 0) earlyJobEvents = {};
+    }
+}
+
+async function downloadAudio() {
+    if (!currentUrl) {
+        showToast('Nenhum vídeo carregado', 'error');
+        return;
+    }
+    
+    showToast('Preparando download... Isso pode levar alguns segundos', 'info');
+    
+    try {
+        await startDownloadJob('/api/download-audio', { youtube_url: currentUrl });
     } catch (error) {
-        showToast('Erro ao baixar áudio', 'error');
+        showToast(error.message || 'Erro ao baixar áudio', 'error');
         console.error('Erro:', error);
     }
 }
@@ -382,90 +458,170 @@ async function downloadPlaylist() {
         return;
     }
     
-    showToast('Baixando playlist para a biblioteca... Isso pode levar vários minutos', 'info');
+    showToast('Baixando playlist para a biblioteca... Acompanhe o progresso aqui', 'info');
     
     try {
-        const response = await fetch('/api/download-playlist', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                youtube_url: currentUrl
-            })
-        });
-        
-        const data = await response.json();
-        
-        if (!response.ok) {
-            showToast(data.error || 'Erro ao baixar playlist', 'error');
-            return;
-        }
-        
-        showToast(`✓ ${data.total} músicas baixadas! Abrindo biblioteca...`, 'success');
-        
-        // Mudar para a aba da biblioteca e atualizar imediatamente
-        switchTab('library');
-        
-        // Aguardar 2 segundos para garantir que os arquivos foram salvos
-        setTimeout(() => {
-            loadLibrary();
-        }, 2000);
-        
+        await startDownloadJob('/api/download-playlist', { youtube_url: currentUrl });
     } catch (error) {
-        showToast('Erro ao baixar playlist', 'error');
+        showToast(error.message || 'Erro ao baixar playlist', 'error');
         console.error('Erro:', error);
     }
 }
 
+function saveFile(url, filename) {
+    const a = document.createElement('a');
+    a.style.display = 'none';
+    a.href = url;
+    a.download = filename;
+    document.body.appendChild(a);
+    a.click();
+    document.body.removeChild(a);
+}
+
+function downloadLibraryZip() {
+    const filenames = [...new Set(libraryTracks.map(t => t.filename))];
+    if (filenames.length === 0) {
+        showToast('Biblioteca vazia', 'error');
+        return;
+    }
+    
+    // POST de formulário: a lista pode não caber na URL e o navegador baixa o ZIP em fluxo
+    const form = document.createElement('form');
+    form.method = 'POST';
+    form.action = '/api/library/zip';
+    form.style.display = 'none';
+    filenames.forEach(filename => {
+        const input = document.createElement('input');
+        input.type = 'hidden';
+        input.name = 'file';
+        input.value = filename;
+        form.appendChild(input);
+    });
+    document.body.appendChild(form);
+    form.submit();
+    document.body.removeChild(form);
+    showToast('Preparando ZIP da biblioteca...', 'info');
+}
+
+function handleJobEvent(job) {
+    if (!pendingJobs[job.job_id]) {
+        if (startingJobs > 0) earlyJobEvents[job.job_id] = job;
+        return;
+    }
+    
+    if (job.status === 'progress') {
+        const position = job.index && job.count ? ` (${job.index}/${job.count})` : '';
+        showToast(`Baixando${position}: ${job.percent}%`, 'info');
+    } else if (job.status === 'converting') {
+        showToast('Convertendo para MP3...', 'info');
+    } else if (job.status === 'error') {
+        delete pendingJobs[job.job_id];
+        showToast(job.kind === 'download_playlist' ? 'Erro ao baixar playlist' : 'Erro ao baixar áudio', 'error');
+        console.error('Erro no download:', job.error);
+    } else if (job.status === 'done') {
+        delete pendingJobs[job.job_id];
+        if (job.kind === 'download_audio') {
+            saveFile(`${streamUrl(job.filename)}?download=1`, job.filename);
+            showToast('Download iniciado! ✓', 'success');
+        } else {
+            showToast(`✓ ${job.total} músicas baixadas! Abrindo biblioteca...`, 'success');
+            saveFile(`/api/library/zip?playlist=${encodeURIComponent(job.youtube_url)}`, 'playlist.zip');
+            switchTab('library');
+        }
+    }
+}
+
+// Espera mínima antes de reabrir o canal de eventos recusado pelo servidor
+const EVENTS_RETRY_MS = 30000;
+
+function connectEvents() {
+    if (!('EventSource' in window)) return;
+    
+    const source = new EventSource('/api/events');
+    
+    // Servidor no limite de conexões (503): o EventSource desiste, então reconecta mais tarde
+    source.addEventListener('error', () => {
+        if (source.readyState === EventSource.CLOSED) {
+            setTimeout(connectEvents, EVENTS_RETRY_MS + Math.random() * EVENTS_RETRY_MS);
+        }
+    });
+    
+    source.addEventListener('job', (event) => {
+        handleJobEvent(JSON.parse(event.data));
+    });
+    
+    source.addEventListener('analysis', (event) => {
+        const { filename } = JSON.parse(event.data);
+        const track = libraryTracks[libraryCurrentIndex];
+        if (track && track.filename === filename) {
+            loadTrackAnalysis(track);
+        }
+    });
+    
+    source.addEventListener('list', (event) => {
+        const { name } = JSON.parse(event.data);
+        const activeTab = document.querySelector('.tab-btn.active');
+        if (!activeTab || activeTab.dataset.tab !== name) return;
+        
+        if (name === 'favorites') {
+            loadFavorites();
+        } else if (name === 'history') {
+            loadHistory();
+        } else if (name === 'library') {
+            loadLibrary();
+        }
+    });
+}
+
 async function loadFavorites() {
     try {
-        const response = await fetch('/api/favorites');
-        const favorites = await response.json();
-        
-        const container = document.getElementById('favoritesList');
-        
-        if (favorites.length === 0) {
-            container.innerHTML = `
-                <div class="empty-state">
-                    <div class="empty-state-icon">⭐</div>
-                    <div class="empty-state-text">Nenhum favorito ainda.<br>Adicione vídeos aos favoritos para acessá-los rapidamente!</div>
+        await fetchList('favorites', '/api/favorites', renderFavorites);
+    } catch (error) {
+        console.error('Erro ao carregar favoritos:', error);
+    }
+}
+
+function renderFavorites(favorites) {
+    const container = document.getElementById('favoritesList');
+    
+    if (favorites.length === 0) {
+        container.innerHTML = `
+            <div class="empty-state">
+                <div class="empty-state-icon">⭐</div>
+                <div class="empty-state-text">Nenhum favorito ainda.<br>Adicione vídeos aos favoritos para acessá-los rapidamente!</div>
+            </div>
+        `;
+        return;
+    }
+    
+    container.innerHTML = favorites.map(fav => {
+        const safeUrl = encodeURIComponent(fav.youtube_url);
+        return `
+            <div class="list-item">
+                <div class="list-item-info">
+                    <div class="list-item-title">${escapeHtml(fav.title)}</div>
+                    <div class="list-item-date">${formatDate(fav.added_at)}</div>
                 </div>
-            `;
-            return;
-        }
-        
-        container.innerHTML = favorites.map(fav => {
-            const safeUrl = encodeURIComponent(fav.youtube_url);
-            return `
-                <div class="list-item">
-                    <div class="list-item-info">
-                        <div class="list-item-title">${escapeHtml(fav.title)}</div>
-                        <div class="list-item-date">${formatDate(fav.added_at)}</div>
-                    </div>
-                    <div class="list-item-actions">
-                        <button class="list-btn play-btn" data-url="${safeUrl}">▶️</button>
-                        <button class="list-btn danger remove-fav-btn" data-id="${fav.id}">🗑️</button>
-                    </div>
+                <div class="list-item-actions">
+                    <button class="list-btn play-btn" data-url="${safeUrl}">▶️</button>
+                    <button class="list-btn danger remove-fav-btn" data-id="${fav.id}">🗑️</button>
                 </div>
-            `;
-        }).join('');
-        
-        container.querySelectorAll('.play-btn').forEach(btn => {
-            btn.addEventListener('click', () => {
-                const url = decodeURIComponent(btn.dataset.url);
-                loadFromUrl(url);
-            });
+            </div>
+        `;
+    }).join('');
+    
+    container.querySelectorAll('.play-btn').forEach(btn => {
+        btn.addEventListener('click', () => {
+            const url = decodeURIComponent(btn.dataset.url);
+            loadFromUrl(url);
         });
-        
-        container.querySelectorAll('.remove-fav-btn').forEach(btn => {
-            btn.addEventListener('click', () => {
-                removeFavorite(parseInt(btn.dataset.id));
-            });
+    });
+    
+    container.querySelectorAll('.remove-fav-btn').forEach(btn => {
+        btn.addEventListener('click', () => {
+            removeFavorite(parseInt(btn.dataset.id));
         });
-    } catch (error) {
-        console.error('Erro ao carregar favoritos:', error);
-    }
+    });
 }
 
 async function removeFavorite(id) {
@@ -480,50 +636,51 @@ async function removeFavorite(id) {
 
 async function loadHistory() {
     try {
-        const response = await fetch('/api/history');
-        const history = await response.json();
-        
-        const container = document.getElementById('historyList');
-        
-        if (history.length === 0) {
-            container.innerHTML = `
-                <div class="empty-state">
-                    <div class="empty-state-icon">📜</div>
-                    <div class="empty-state-text">Nenhum histórico ainda.<br>Comece a reproduzir vídeos!</div>
-                </div>
-            `;
-            document.getElementById('clearHistoryBtn').style.display = 'none';
-            return;
-        }
-        
-        document.getElementById('clearHistoryBtn').style.display = 'block';
-        
-        container.innerHTML = history.map(item => {
-            const safeUrl = encodeURIComponent(item.youtube_url);
-            return `
-                <div class="list-item">
-                    <div class="list-item-info">
-                        <div class="list-item-title">${escapeHtml(item.title)}</div>
-                        <div class="list-item-date">${formatDate(item.played_at)}</div>
-                    </div>
-                    <div class="list-item-actions">
-                        <button class="list-btn play-btn" data-url="${safeUrl}">▶️</button>
-                    </div>
-                </div>
-            `;
-        }).join('');
-        
-        container.querySelectorAll('.play-btn').forEach(btn => {
-            btn.addEventListener('click', () => {
-                const url = decodeURIComponent(btn.dataset.url);
-                loadFromUrl(url);
-            });
-        });
+        await fetchList('history', '/api/history', renderHistory);
     } catch (error) {
         console.error('Erro ao carregar histórico:', error);
     }
 }
 
+function renderHistory(history) {
+    const container = document.getElementById('historyList');
+    
+    if (history.length === 0) {
+        container.innerHTML = `
+            <div class="empty-state">
+                <div class="empty-state-icon">📜</div>
+                <div class="empty-state-text">Nenhum histórico ainda.<br>Comece a reproduzir vídeos!</div>
+            </div>
+        `;
+        document.getElementById('clearHistoryBtn').style.display = 'none';
+        return;
+    }
+    
+    document.getElementById('clearHistoryBtn').style.display = 'block';
+    
+    container.innerHTML = history.map(item => {
+        const safeUrl = encodeURIComponent(item.youtube_url);
+        return `
+            <div class="list-item">
+                <div class="list-item-info">
+                    <div class="list-item-title">${escapeHtml(item.title)}</div>
+                    <div class="list-item-date">${formatDate(item.played_at)}</div>
+                </div>
+                <div class="list-item-actions">
+                    <button class="list-btn play-btn" data-url="${safeUrl}">▶️</button>
+                </div>
+            </div>
+        `;
+    }).join('');
+    
+    container.querySelectorAll('.play-btn').forEach(btn => {
+        btn.addEventListener('click', () => {
+            const url = decodeURIComponent(btn.dataset.url);
+            loadFromUrl(url);
+        });
+    });
+}
+
 async function clearHistory() {
     if (!confirm('Tem certeza que deseja limpar todo o histórico?')) return;
     
@@ -563,33 +720,58 @@ function formatDate(dateString) {
     });
 }
 
-let libraryAudio = new Audio();
+let libraryAudio = createLibraryAudio();
 let libraryTracks = [];
 let libraryCurrentIndex = -1;
 let libraryIsPlaying = false;
 let libraryShuffle = false;
+let libraryShuffleSeed = '';
 let libraryRepeat = false;
+let libraryUserVolume = 0.7;
+let libraryGain = 1;
+let libraryWaveform = [];
 
-libraryAudio.addEventListener('timeupdate', () => {
-    if (libraryAudio.duration) {
-        const progress = (libraryAudio.currentTime / libraryAudio.duration) * 100;
-        document.getElementById('libraryProgressBar').value = progress;
-        document.getElementById('libraryCurrentTime').textContent = formatTime(libraryAudio.currentTime);
-    }
-});
+// Segundo elemento de áudio carrega a próxima faixa prevista enquanto a atual toca
+let libraryPreloadAudio = createLibraryAudio();
+let libraryPreloadFilename = null;
+let libraryUpcoming = [];
 
-libraryAudio.addEventListener('ended', () => {
-    if (libraryRepeat) {
-        libraryAudio.currentTime = 0;
-        libraryAudio.play();
-    } else {
-        libraryNext();
-    }
-});
+// Loudness alvo da normalização (LUFS); faixas mais altas são atenuadas
+const LIBRARY_TARGET_LUFS = -14;
 
-libraryAudio.addEventListener('loadedmetadata', () => {
-    document.getElementById('libraryDuration').textContent = formatTime(libraryAudio.duration);
-});
+// Faixas previstas pedidas ao servidor; das seguintes à próxima só o início é aquecido
+const LIBRARY_PREFETCH_COUNT = 3;
+const LIBRARY_WARM_BYTES = 256 * 1024;
+
+function createLibraryAudio() {
+    const audio = new Audio();
+    audio.preload = 'auto';
+    
+    audio.addEventListener('timeupdate', () => {
+        if (audio !== libraryAudio || !audio.duration) return;
+        const progress = (audio.currentTime / audio.duration) * 100;
+        document.getElementById('libraryProgressBar').value = progress;
+        document.getElementById('libraryCurrentTime').textContent = formatTime(audio.currentTime);
+        drawWaveform();
+    });
+    
+    audio.addEventListener('ended', () => {
+        if (audio !== libraryAudio) return;
+        if (libraryRepeat) {
+            audio.currentTime = 0;
+            audio.play();
+        } else {
+            libraryNext();
+        }
+    });
+    
+    audio.addEventListener('loadedmetadata', () => {
+        if (audio !== libraryAudio) return;
+        document.getElementById('libraryDuration').textContent = formatTime(audio.duration);
+    });
+    
+    return audio;
+}
 
 document.getElementById('libraryProgressBar').addEventListener('input', (e) => {
     if (libraryAudio.duration && isFinite(libraryAudio.duration)) {
@@ -599,10 +781,59 @@ document.getElementById('libraryProgressBar').addEventListener('input', (e) => {
 });
 
 document.getElementById('libraryVolume').addEventListener('input', (e) => {
-    libraryAudio.volume = e.target.value / 100;
+    libraryUserVolume = e.target.value / 100;
+    applyLibraryVolume();
     document.getElementById('libraryVolumePercent').textContent = e.target.value + '%';
 });
 
+document.getElementById('libraryWaveform').addEventListener('click', (e) => {
+    if (libraryAudio.duration && isFinite(libraryAudio.duration)) {
+        const rect = e.currentTarget.getBoundingClientRect();
+        libraryAudio.currentTime = ((e.clientX - rect.left) / rect.width) * libraryAudio.duration;
+        drawWaveform();
+    }
+});
+
+function applyLibraryVolume() {
+    libraryAudio.volume = Math.min(1, libraryUserVolume * libraryGain);
+}
+
+function drawWaveform() {
+    const canvas = document.getElementById('libraryWaveform');
+    canvas.classList.toggle('ready', libraryWaveform.length > 0);
+    if (!libraryWaveform.length) return;
+    
+    const ratio = window.devicePixelRatio || 1;
+    const width = canvas.width = canvas.clientWidth * ratio;
+    const height = canvas.height = canvas.clientHeight * ratio;
+    const ctx = canvas.getContext('2d');
+    const progress = libraryAudio.duration ? libraryAudio.currentTime / libraryAudio.duration : 0;
+    const barWidth = width / libraryWaveform.length;
+    
+    ctx.clearRect(0, 0, width, height);
+    libraryWaveform.forEach((value, i) => {
+        const barHeight = Math.max(ratio, (value / 100) * height);
+        ctx.fillStyle = i / libraryWaveform.length < progress ? '#6366f1' : '#d1d5db';
+        ctx.fillRect(i * barWidth, (height - barHeight) / 2, Math.max(1, barWidth - 1), barHeight);
+    });
+}
+
+async function loadTrackAnalysis(track) {
+    try {
+        const response = await fetch(`/api/library/analysis/${encodeURIComponent(track.filename)}`);
+        if (response.status !== 200) return;
+        const data = await response.json();
+        if (libraryTracks[libraryCurrentIndex] !== track) return;
+        
+        libraryGain = data.loudness == null ? 1 : Math.pow(10, (LIBRARY_TARGET_LUFS - data.loudness) / 20);
+        libraryWaveform = data.waveform || [];
+        applyLibraryVolume();
+        drawWaveform();
+    } catch (error) {
+        console.error('Erro ao carregar análise da faixa:', error);
+    }
+}
+
 function formatTime(seconds) {
     const mins = Math.floor(seconds / 60);
     const secs = Math.floor(seconds % 60);
@@ -632,7 +863,28 @@ function libraryPlayTrack(index) {
     libraryCurrentIndex = index;
     const track = libraryTracks[index];
     
-    libraryAudio.src = `/api/library/stream/${encodeURIComponent(track.filename)}`;
+    if (libraryPreloadFilename === track.filename) {
+        // Faixa já carregada no segundo elemento: troca sem nova requisição
+        const previous = libraryAudio;
+        libraryAudio = libraryPreloadAudio;
+        libraryPreloadAudio = previous;
+        previous.pause();
+        libraryAudio.currentTime = 0;
+        if (libraryAudio.duration) {
+            document.getElementById('libraryDuration').textContent = formatTime(libraryAudio.duration);
+        }
+    } else {
+        libraryAudio.src = streamUrl(track.filename);
+    }
+    libraryPreloadFilename = null;
+    libraryUpcoming = [];
+    
+    libraryGain = 1;
+    libraryWaveform = [];
+    applyLibraryVolume();
+    drawWaveform();
+    loadTrackAnalysis(track);
+    
     libraryAudio.play();
     libraryIsPlaying = true;
     
@@ -642,16 +894,63 @@ function libraryPlayTrack(index) {
     document.querySelectorAll('.library-item').forEach((item, i) => {
         item.classList.toggle('playing', i === index);
     });
+    
+    prefetchLibraryQueue(track);
+}
+
+async function prefetchLibraryQueue(track) {
+    const params = new URLSearchParams({
+        current: track.filename,
+        shuffle: libraryShuffle ? '1' : '0',
+        repeat: libraryRepeat ? '1' : '0',
+        seed: libraryShuffleSeed,
+        n: LIBRARY_PREFETCH_COUNT
+    });
+    
+    try {
+        const response = await fetch(`/api/library/queue?${params}`);
+        if (!response.ok) return;
+        const data = await response.json();
+        if (libraryTracks[libraryCurrentIndex] !== track) return;
+        
+        libraryUpcoming = data.tracks.map(t => t.filename).filter(filename => filename !== track.filename);
+        const [next, ...rest] = libraryUpcoming;
+        
+        if (next && next !== libraryPreloadFilename) {
+            libraryPreloadFilename = next;
+            libraryPreloadAudio.src = streamUrl(next);
+            libraryPreloadAudio.load();
+        }
+        
+        // Início das faixas seguintes fica no cache HTTP para um salto rápido
+        rest.forEach(filename => {
+            fetch(streamUrl(filename), { headers: { Range: `bytes=0-${LIBRARY_WARM_BYTES - 1}` } })
+                .then(r => r.arrayBuffer())
+                .catch(() => {});
+        });
+    } catch (error) {
+        console.error('Erro ao prever próximas faixas:', error);
+    }
+}
+
+function streamUrl(filename) {
+    return `/api/library/stream/${encodeURIComponent(filename)}`;
 }
 
 function libraryNext() {
     if (libraryTracks.length === 0) return;
     
-    let nextIndex;
-    if (libraryShuffle) {
-        nextIndex = Math.floor(Math.random() * libraryTracks.length);
-    } else {
-        nextIndex = (libraryCurrentIndex + 1) % libraryTracks.length;
+    // Segue a fila prevista pelo servidor, que é a mesma já pré-carregada
+    let nextIndex = -1;
+    if (libraryUpcoming.length > 0) {
+        nextIndex = libraryTracks.findIndex(t => t.filename === libraryUpcoming[0]);
+    }
+    if (nextIndex === -1) {
+        if (libraryShuffle) {
+            nextIndex = Math.floor(Math.random() * libraryTracks.length);
+        } else {
+            nextIndex = (libraryCurrentIndex + 1) % libraryTracks.length;
+        }
     }
     
     libraryPlayTrack(nextIndex);
@@ -673,12 +972,21 @@ function libraryPrevious() {
 
 function libraryToggleShuffle() {
     libraryShuffle = !libraryShuffle;
+    // Nova semente a cada vez que o aleatório é ligado: nova ordem, estável até desligar
+    if (libraryShuffle) libraryShuffleSeed = Math.random().toString(36).slice(2);
     document.getElementById('libraryShuffleBtn').classList.toggle('active', libraryShuffle);
+    refreshLibraryQueue();
 }
 
 function libraryToggleRepeat() {
     libraryRepeat = !libraryRepeat;
     document.getElementById('libraryRepeatBtn').classList.toggle('active', libraryRepeat);
+    refreshLibraryQueue();
+}
+
+function refreshLibraryQueue() {
+    const track = libraryTracks[libraryCurrentIndex];
+    if (track) prefetchLibraryQueue(track);
 }
 
 async function loadLibrary() {
@@ -693,33 +1001,7 @@ async function loadLibrary() {
     `;
     
     try {
-        const response = await fetch('/api/library');
-        libraryTracks = await response.json();
-        
-        if (libraryTracks.length === 0) {
-            container.innerHTML = `
-                <div class="empty-state">
-                    <div class="empty-state-icon">🎵</div>
-                    <div class="empty-state-text">Nenhuma música na biblioteca.<br>Baixe músicas do YouTube!</div>
-                </div>
-            `;
-            return;
-        }
-        
-        container.innerHTML = libraryTracks.map((track, index) => `
-            <div class="library-item" data-index="${index}" onclick="libraryPlayTrack(${index})" style="cursor: pointer;">
-                <div class="library-item-info">
-                    <div class="library-item-title">${escapeHtml(track.title)}</div>
-                    <div class="library-item-duration">${formatDate(track.downloaded_at)}</div>
-                </div>
-                <div class="library-item-actions" onclick="event.stopPropagation();">
-                    <button class="library-item-btn" onclick="libraryPlayTrack(${index})">▶️</button>
-                    <button class="library-item-btn" onclick="deleteLibraryTrack('${encodeURIComponent(track.filename)}')">🗑️</button>
-                </div>
-            </div>
-        `).join('');
-        
-        showToast(`${libraryTracks.length} música(s) na biblioteca`, 'success');
+        await fetchList('library', '/api/library', renderLibrary);
     } catch (error) {
         console.error('Erro ao carregar biblioteca:', error);
         container.innerHTML = `
@@ -731,11 +1013,107 @@ async function loadLibrary() {
     }
 }
 
+async function renderLibrary(tracks, fromCache) {
+    const container = document.getElementById('libraryList');
+    libraryTracks = tracks;
+    
+    if (libraryTracks.length === 0) {
+        container.innerHTML = `
+            <div class="empty-state">
+                <div class="empty-state-icon">🎵</div>
+                <div class="empty-state-text">Nenhuma música na biblioteca.<br>Baixe músicas do YouTube!</div>
+            </div>
+        `;
+        return;
+    }
+    
+    const pins = await Promise.all(tracks.map(track => localCache.get('pins', cacheKey(track.filename))));
+    
+    container.innerHTML = libraryTracks.map((track, index) => `
+        <div class="library-item" data-index="${index}" onclick="libraryPlayTrack(${index})" style="cursor: pointer;">
+            <div class="library-item-info">
+                <div class="library-item-title">${escapeHtml(track.title)}</div>
+                <div class="library-item-duration">${formatDate(track.downloaded_at)}</div>
+            </div>
+            <div class="library-item-actions" onclick="event.stopPropagation();">
+                <button class="library-item-btn" onclick="libraryPlayTrack(${index})">▶️</button>
+                <button class="library-item-btn pin-btn${pins[index] ? ' pinned' : ''}" onclick="togglePinTrack(${index})" title="Disponível offline">📌</button>
+                <button class="library-item-btn delete-track-btn" data-filename="${encodeURIComponent(track.filename)}">🗑️</button>
+            </div>
+        </div>
+    `).join('');
+    
+    container.querySelectorAll('.delete-track-btn').forEach(btn => {
+        btn.addEventListener('click', () => {
+            deleteLibraryTrack(decodeURIComponent(btn.dataset.filename));
+        });
+    });
+    
+    if (!fromCache) {
+        showToast(`${libraryTracks.length} música(s) na biblioteca`, 'success');
+    }
+}
+
+function postToServiceWorker(message) {
+    return new Promise((resolve) => {
+        const channel = new MessageChannel();
+        channel.port1.onmessage = (event) => resolve(event.data);
+        navigator.serviceWorker.controller.postMessage(message, [channel.port2]);
+    });
+}
+
+async function togglePinTrack(index) {
+    const track = libraryTracks[index];
+    if (!track) return;
+    
+    if (!('serviceWorker' in navigator) || !navigator.serviceWorker.controller) {
+        showToast('Modo offline indisponível neste navegador', 'error');
+        return;
+    }
+    
+    const key = cacheKey(track.filename);
+    const pinned = await localCache.get('pins', key);
+    
+    if (!pinned) {
+        showToast('Salvando música para ouvir offline...', 'info');
+    }
+    
+    const result = await postToServiceWorker({
+        type: pinned ? 'unpin' : 'pin',
+        url: streamUrl(track.filename)
+    });
+    
+    if (!result || !result.ok) {
+        showToast('Erro ao salvar música offline', 'error');
+        return;
+    }
+    
+    if (pinned) {
+        await localCache.remove('pins', key);
+        showToast('Música removida do modo offline', 'success');
+    } else {
+        await localCache.put('pins', { key, filename: track.filename });
+        showToast('Música disponível offline ✓', 'success');
+    }
+    
+    const btn = document.querySelector(`.library-item[data-index="${index}"] .pin-btn`);
+    if (btn) btn.classList.toggle('pinned', !pinned);
+}
+
 async function deleteLibraryTrack(filename) {
     if (!confirm('Deseja realmente excluir esta música?')) return;
     
     try {
-        await fetch(`/api/library/${filename}`, { method: 'DELETE' });
+        await fetch(`/api/library/${encodeURIComponent(filename)}`, { method: 'DELETE' });
+        
+        const key = cacheKey(filename);
+        if (await localCache.get('pins', key)) {
+            await localCache.remove('pins', key);
+            if (navigator.serviceWorker && navigator.serviceWorker.controller) {
+                postToServiceWorker({ type: 'unpin', url: streamUrl(filename) });
+            }
+        }
+        
         showToast('Música excluída', 'success');
         loadLibrary();
     } catch (error) {
@@ -743,8 +1121,33 @@ async function deleteLibraryTrack(filename) {
     }
 }
 
+// Ao sair, apaga listas, faixas offline e a página inicial guardadas no navegador
+async function clearLocalData() {
+    await localCache.clear();
+    if ('caches' in window) {
+        await Promise.all([caches.delete('ytbp-shell-v1'), caches.delete('ytbp-tracks-v1')]);
+    }
+}
+
 document.addEventListener('DOMContentLoaded', () => {
+    const logoutLink = document.querySelector('.btn-logout');
+    if (logoutLink) {
+        logoutLink.addEventListener('click', (event) => {
+            event.preventDefault();
+            clearLocalData()
+                .catch((error) => console.error('Erro ao limpar dados locais:', error))
+                .finally(() => { window.location.href = logoutLink.href; });
+        });
+    }
+    
     loadFavorites();
     loadHistory();
-    libraryAudio.volume = 0.7;
+    connectEvents();
+    applyLibraryVolume();
+    
+    if ('serviceWorker' in navigator) {
+        navigator.serviceWorker.register('/sw.js').catch((error) => {
+            console.error('Erro ao registrar service worker:', error);
+        });
+    }
 });
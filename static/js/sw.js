@@ -0,0 +1,189 @@
+const SHELL_CACHE = 'ytbp-shell-v1';
+const TRACKS_CACHE = 'ytbp-tracks-v1';
+const MANIFEST_URL = '/static/dist/manifest.json';
+// Arquivos do shell relativos a /static/; com build, viram as versões com hash do manifest
+const SHELL_ASSETS = [
+    'css/style.css',
+    'css/auth.css',
+    'js/player.js',
+    'images/favicon.svg'
+];
+
+self.addEventListener('install', (event) => {
+    // Falhas individuais (ex.: "/" redirecionando para o login) não impedem a instalação
+    event.waitUntil(
+        Promise.all([caches.open(SHELL_CACHE), currentAssets()])
+            .then(([cache, assets]) => Promise.all(['/', ...assets.shell].map((url) =>
+                fetch(url, { credentials: 'same-origin' })
+                    .then((response) => {
+                        if (response.ok && !response.redirected) {
+                            return cache.put(url, response);
+                        }
+                    })
+                    .catch(() => {})
+            )))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', (event) => {
+    const keep = [SHELL_CACHE, TRACKS_CACHE];
+    event.waitUntil(
+        caches.keys()
+            .then((keys) => Promise.all(
+                keys.filter((key) => !keep.includes(key)).map((key) => caches.delete(key))
+            ))
+            .then(pruneShell)
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) return;
+
+    if (url.pathname.startsWith('/api/library/stream/')) {
+        event.respondWith(serveTrack(request, url));
+    } else if (url.pathname.startsWith('/static/')) {
+        event.respondWith(staleWhileRevalidate(request));
+    } else if (request.mode === 'navigate' && url.pathname === '/') {
+        event.respondWith(networkFirst(request));
+    }
+    // As listas da API são revalidadas pela página (IndexedDB + ETag)
+});
+
+self.addEventListener('message', (event) => {
+    const data = event.data || {};
+    if (data.type === 'pin') {
+        event.waitUntil(pinTrack(data.url).then((ok) => reply(event, { type: 'pinned', url: data.url, ok })));
+    } else if (data.type === 'unpin') {
+        event.waitUntil(
+            caches.open(TRACKS_CACHE)
+                .then((cache) => cache.delete(data.url))
+                .then(() => reply(event, { type: 'unpinned', url: data.url, ok: true }))
+        );
+    }
+});
+
+function reply(event, message) {
+    if (event.ports && event.ports[0]) {
+        event.ports[0].postMessage(message);
+    }
+}
+
+async function pinTrack(url) {
+    try {
+        const response = await fetch(url, { credentials: 'same-origin' });
+        if (!response.ok) return false;
+        const cache = await caches.open(TRACKS_CACHE);
+        await cache.put(url, response);
+        return true;
+    } catch (error) {
+        return false;
+    }
+}
+
+async function serveTrack(request, url) {
+    const cache = await caches.open(TRACKS_CACHE);
+    const cached = await cache.match(url.pathname);
+    if (!cached) return fetch(request);
+    return rangeResponse(request, cached);
+}
+
+async function rangeResponse(request, cached) {
+    // O elemento <audio> pede intervalos de bytes; respondemos 206 a partir do cache
+    const range = request.headers.get('Range');
+    if (!range) return cached;
+
+    const blob = await cached.blob();
+    const match = /bytes=(\d*)-(\d*)/.exec(range);
+    let start = match && match[1] ? parseInt(match[1], 10) : 0;
+    let end = match && match[2] ? parseInt(match[2], 10) : blob.size - 1;
+    if (match && !match[1] && match[2]) {
+        start = Math.max(blob.size - parseInt(match[2], 10), 0);
+        end = blob.size - 1;
+    }
+    end = Math.min(end, blob.size - 1);
+
+    if (start > end) {
+        return new Response(null, {
+            status: 416,
+            headers: { 'Content-Range': `bytes */${blob.size}` }
+        });
+    }
+
+    return new Response(blob.slice(start, end + 1), {
+        status: 206,
+        headers: {
+            'Content-Type': cached.headers.get('Content-Type') || 'audio/mpeg',
+            'Content-Range': `bytes ${start}-${end}/${blob.size}`,
+            'Content-Length': String(end - start + 1),
+            'Accept-Ranges': 'bytes'
+        }
+    });
+}
+
+async function currentAssets() {
+    // URLs de /static/ da versão publicada; sem build, os templates usam os originais
+    try {
+        const response = await fetch(MANIFEST_URL, { cache: 'no-store' });
+        if (response.ok) {
+            const manifest = await response.json();
+            return {
+                shell: SHELL_ASSETS.filter((path) => manifest[path]).map((path) => `/static/${manifest[path]}`),
+                current: new Set(Object.values(manifest).map((path) => `/static/${path}`))
+            };
+        }
+    } catch (error) {
+        // Offline: mantém o cache como está
+        return { shell: [], current: null, offline: true };
+    }
+    return { shell: SHELL_ASSETS.map((path) => `/static/${path}`), current: null };
+}
+
+async function pruneShell() {
+    // Remove do cache do shell os assets de builds anteriores
+    const assets = await currentAssets();
+    if (assets.offline) return;
+    const cache = await caches.open(SHELL_CACHE);
+    const requests = await cache.keys();
+    await Promise.all(requests
+        .filter((request) => {
+            const path = new URL(request.url).pathname;
+            if (!path.startsWith('/static/')) return false;
+            return assets.current ? !assets.current.has(path) : path.startsWith('/static/dist/');
+        })
+        .map((request) => cache.delete(request)));
+}
+
+async function staleWhileRevalidate(request) {
+    const cache = await caches.open(SHELL_CACHE);
+    const cached = await cache.match(request);
+    const network = fetch(request)
+        .then((response) => {
+            if (response.ok) {
+                cache.put(request, response.clone());
+            }
+            return response;
+        })
+        .catch(() => cached);
+    return cached || network;
+}
+
+async function networkFirst(request) {
+    const cache = await caches.open(SHELL_CACHE);
+    try {
+        const response = await fetch(request);
+        if (response.ok && !response.redirected) {
+            cache.put('/', response.clone());
+        }
+        return response;
+    } catch (error) {
+        const cached = await cache.match('/');
+        if (cached) return cached;
+        throw error;
+    }
+}
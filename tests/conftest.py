@@ -0,0 +1,68 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Os módulos leem os caminhos na importação; cada teste troca por uma pasta própria
+_base = tempfile.mkdtemp(prefix='ytbp-tests-')
+os.environ['DATABASE_PATH'] = os.path.join(_base, 'database.db')
+os.environ['DOWNLOADS_DIR'] = os.path.join(_base, 'downloads')
+os.environ['LAZY_INIT'] = '1'
+
+PASSWORD = 'senha123'
+
+
+@pytest.fixture
+def downloads_dir(tmp_path, monkeypatch):
+    """Banco e pasta de downloads vazios para o teste"""
+    import app
+    import database
+    import downloader
+
+    downloads = tmp_path / 'downloads'
+    downloads.mkdir()
+    monkeypatch.setattr(database, 'DATABASE_PATH', str(tmp_path / 'database.db'))
+    monkeypatch.setattr(app, 'DOWNLOADS_DIR', str(downloads))
+    monkeypatch.setattr(downloader, 'DOWNLOADS_DIR', str(downloads))
+    database.init_db()
+    return str(downloads)
+
+
+@pytest.fixture
+def login(downloads_dir):
+    """Cria um usuário e retorna (id, cliente autenticado)"""
+    import app
+    from database import User
+
+    app.app.config['WTF_CSRF_ENABLED'] = False
+
+    def _login(username, email=None):
+        email = email or f'{username}@example.com'
+        user_id = User.create(username, email, PASSWORD)
+        client = app.app.test_client()
+        response = client.post('/login', data={'email': email, 'password': PASSWORD})
+        assert response.status_code == 302
+        return user_id, client
+
+    return _login
+
+
+def add_download(user_id, filename, youtube_url='https://www.youtube.com/watch?v=aaaaaaaaaaa'):
+    from database import get_db
+
+    conn = get_db()
+    conn.execute('INSERT INTO downloads (user_id, title, youtube_url, filename) VALUES (?, ?, ?, ?)',
+                 (user_id, filename[:-4], youtube_url, filename))
+    conn.commit()
+    conn.close()
+
+
+def write_file(directory, name, content):
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
@@ -0,0 +1,39 @@
+import json
+
+import pytest
+from flask import Flask
+
+import assets
+
+
+@pytest.fixture
+def asset_app(tmp_path):
+    static = tmp_path / 'static'
+    (static / 'dist' / 'js').mkdir(parents=True)
+    (static / 'dist' / 'js' / 'player.abc123.js').write_bytes(b'console.log(1)')
+    (static / 'dist' / 'js' / 'player.abc123.js.gz').write_bytes(b'gzip')
+    (static / 'dist' / 'manifest.json').write_text(json.dumps({'js/player.js': 'dist/js/player.abc123.js'}))
+    app = Flask(__name__, static_folder=str(static))
+    assets.init_assets(app)
+    return app
+
+
+def test_serves_gzip_when_accepted(asset_app):
+    response = asset_app.test_client().get('/static/dist/js/player.abc123.js',
+                                           headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.data == b'gzip'
+
+
+def test_ignores_encoding_refused_with_q_zero(asset_app):
+    response = asset_app.test_client().get('/static/dist/js/player.abc123.js',
+                                           headers={'Accept-Encoding': 'gzip;q=0, identity'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.data == b'console.log(1)'
+
+
+def test_manifest_is_not_immutable(asset_app):
+    response = asset_app.test_client().get('/static/dist/manifest.json')
+    assert response.status_code == 200
+    assert not response.cache_control.immutable
+    assert asset_app.config['ASSET_VERSION']
@@ -0,0 +1,75 @@
+import os
+
+import dedup
+from conftest import add_download, write_file
+
+
+def test_register_keeps_one_copy_of_identical_audio(downloads_dir):
+    first = write_file(downloads_dir, 'Musica [aaaaaaaaaaa].mp3', b'audio')
+    second = write_file(downloads_dir, 'Reupload [bbbbbbbbbbb].mp3', b'audio')
+
+    assert dedup.register(downloads_dir, first, 'aaaaaaaaaaa') == 'Musica [aaaaaaaaaaa].mp3'
+    assert dedup.register(downloads_dir, second, 'bbbbbbbbbbb') == 'Musica [aaaaaaaaaaa].mp3'
+
+    assert not os.path.exists(second)
+    assert dedup.lookup_source(downloads_dir, 'bbbbbbbbbbb') == 'Musica [aaaaaaaaaaa].mp3'
+
+
+def test_register_keeps_different_audio_apart(downloads_dir):
+    first = write_file(downloads_dir, 'Musica [aaaaaaaaaaa].mp3', b'audio 1')
+    second = write_file(downloads_dir, 'Musica [bbbbbbbbbbb].mp3', b'audio 2')
+
+    assert dedup.register(downloads_dir, first, 'aaaaaaaaaaa') == 'Musica [aaaaaaaaaaa].mp3'
+    assert dedup.register(downloads_dir, second, 'bbbbbbbbbbb') == 'Musica [bbbbbbbbbbb].mp3'
+    assert os.path.exists(first) and os.path.exists(second)
+
+
+def test_forget_drops_file_and_sources(downloads_dir):
+    path = write_file(downloads_dir, 'Musica [aaaaaaaaaaa].mp3', b'audio')
+    dedup.register(downloads_dir, path, 'aaaaaaaaaaa')
+
+    dedup.forget('Musica [aaaaaaaaaaa].mp3')
+
+    assert dedup.lookup_source(downloads_dir, 'aaaaaaaaaaa') is None
+    assert dedup.lookup_hash(downloads_dir, dedup.file_sha256(path)) is None
+
+
+def test_lookup_ignores_files_missing_from_disk(downloads_dir):
+    path = write_file(downloads_dir, 'Musica [aaaaaaaaaaa].mp3', b'audio')
+    dedup.register(downloads_dir, path, 'aaaaaaaaaaa')
+    os.remove(path)
+
+    assert dedup.lookup_source(downloads_dir, 'aaaaaaaaaaa') is None
+
+
+def test_video_id_from_url():
+    assert dedup.video_id_from_url('https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=1') == 'dQw4w9WgXcQ'
+    assert dedup.video_id_from_url('https://youtu.be/dQw4w9WgXcQ') == 'dQw4w9WgXcQ'
+    assert dedup.video_id_from_url('https://example.com/audio.mp3') is None
+
+
+def test_delete_keeps_file_while_another_user_references_it(login, downloads_dir):
+    filename = 'Musica [aaaaaaaaaaa].mp3'
+    path = write_file(downloads_dir, filename, b'audio')
+    dedup.register(downloads_dir, path, 'aaaaaaaaaaa')
+    alice, alice_client = login('alice')
+    bob, bob_client = login('bob')
+    add_download(alice, filename)
+    add_download(bob, filename)
+
+    assert alice_client.delete(f'/api/library/{filename}').status_code == 200
+    assert os.path.exists(path)
+    assert dedup.lookup_source(downloads_dir, 'aaaaaaaaaaa') == filename
+
+    assert bob_client.delete(f'/api/library/{filename}').status_code == 200
+    assert not os.path.exists(path)
+    assert dedup.lookup_source(downloads_dir, 'aaaaaaaaaaa') is None
+
+
+def test_delete_of_track_outside_library_keeps_file(login, downloads_dir):
+    filename = 'Musica [aaaaaaaaaaa].mp3'
+    path = write_file(downloads_dir, filename, b'audio')
+    _, client = login('mallory')
+
+    assert client.delete(f'/api/library/{filename}').status_code == 200
+    assert os.path.exists(path)
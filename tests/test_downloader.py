@@ -0,0 +1,46 @@
+import os
+
+import downloader
+from database import get_db
+
+
+class FakeYoutubeDL:
+    """Simula o yt-dlp: respeita o match_filter e grava o MP3 do vídeo"""
+
+    def __init__(self, opts):
+        self.opts = opts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def extract_info(self, url, download=True):
+        info = {'id': 'abcdefghijk', 'title': 'Musica', 'webpage_url': url}
+        if self.opts['match_filter'](info):
+            return None
+        path = os.path.join(downloader.DOWNLOADS_DIR, 'Musica [abcdefghijk].mp3')
+        with open(path, 'wb') as f:
+            f.write(b'audio')
+        return dict(info, requested_downloads=[{'filepath': path}])
+
+
+def test_same_video_through_another_url_is_not_listed_twice(login, downloads_dir, monkeypatch):
+    user_id, client = login('alice')
+    published, submitted = [], []
+    monkeypatch.setattr(downloader, '_youtube_dl', FakeYoutubeDL)
+    monkeypatch.setattr(downloader.events, 'publish', lambda uid, kind, data: published.append((kind, data)))
+    monkeypatch.setattr(downloader.jobs, 'submit', lambda name, uid, **kwargs: submitted.append(name))
+
+    downloader.download_audio('j1', user_id, 'https://www.youtube.com/watch?v=abcdefghijk')
+    downloader.download_audio('j2', user_id, 'https://youtu.be/abcdefghijk')
+
+    conn = get_db()
+    count = conn.execute('SELECT COUNT(*) FROM downloads WHERE user_id = ?', (user_id,)).fetchone()[0]
+    conn.close()
+    assert count == 1
+    assert len(client.get('/api/library').get_json()) == 1
+    assert submitted == ['analyze_track']
+    assert [data for kind, data in published if kind == 'list'] == [{'name': 'library'}]
+    assert [data['job_id'] for kind, data in published if data.get('status') == 'done'] == ['j1', 'j2']
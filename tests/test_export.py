@@ -0,0 +1,17 @@
+import zipfile
+from io import BytesIO
+from urllib.parse import unquote
+
+
+def test_export_with_non_ascii_username(login):
+    _, client = login('用户"x', 'user@example.com')
+
+    response = client.get('/api/export')
+
+    assert response.status_code == 200
+    disposition = response.headers['Content-Disposition']
+    disposition.encode('latin-1')
+    assert 'filename="ytbp-\\"x-' in disposition
+    assert "filename*=UTF-8''" in disposition
+    assert 'ytbp-用户"x-' in unquote(disposition.split("UTF-8''", 1)[1])
+    assert zipfile.ZipFile(BytesIO(response.data)).namelist()
@@ -0,0 +1,34 @@
+import threading
+
+import redis
+
+import jobs
+
+
+class FlakyQueue(jobs.RedisQueue):
+    """Fila que falha na primeira leitura, entrega um job e depois para o worker"""
+
+    def __init__(self, stop):
+        self.stop = stop
+        self.calls = 0
+
+    def pop(self, timeout=5):
+        self.calls += 1
+        if self.calls == 1:
+            raise redis.ConnectionError('Connection refused')
+        if self.calls == 2:
+            return {'job_id': 'j1', 'name': 'echo', 'user_id': 1, 'kwargs': {'value': 42}}
+        self.stop.set()
+        return None
+
+
+def test_work_survives_redis_errors(monkeypatch):
+    stop = threading.Event()
+    done = []
+    monkeypatch.setattr(jobs, '_queue', FlakyQueue(stop))
+    monkeypatch.setattr(jobs, 'RETRY_MIN_DELAY', 0)
+    monkeypatch.setitem(jobs.TASKS, 'echo', lambda job_id, user_id, value: done.append(value))
+
+    jobs.work(stop)
+
+    assert done == [42]
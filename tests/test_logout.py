@@ -0,0 +1,8 @@
+def test_logout_clears_browser_data(login):
+    _, client = login('alice')
+
+    response = client.get('/logout')
+
+    assert response.status_code == 302
+    assert response.headers['Clear-Site-Data'] == '"cache", "storage"'
+    assert client.get('/').status_code == 302
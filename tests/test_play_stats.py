@@ -0,0 +1,103 @@
+import io
+
+import transfer
+from database import get_db, rebuild_play_stats
+
+PLAYS = ['aaaaaaaaaaa', 'bbbbbbbbbbb', 'aaaaaaaaaaa', 'ccccccccccc', 'aaaaaaaaaaa', 'bbbbbbbbbbb', None]
+
+
+def _play(client, video_id):
+    url = f'https://www.youtube.com/watch?v={video_id}' if video_id else 'https://example.com/radio'
+    response = client.post('/api/history', json={'title': f'Faixa {video_id}', 'youtube_url': url,
+                                                 'video_id': video_id})
+    assert response.status_code == 200
+
+
+def _snapshot(user_id):
+    """Tabelas de estatísticas, com last_seq trocado pela posição (os valores diferem entre os caminhos)"""
+    conn = get_db()
+    stats = [tuple(row) for row in conn.execute('''
+        SELECT track_key, title, youtube_url, video_id, play_count FROM play_stats
+        WHERE user_id = ? ORDER BY last_seq
+    ''', (user_id,))]
+    transitions = [tuple(row) for row in conn.execute('''
+        SELECT from_key, to_key, count FROM play_transitions
+        WHERE user_id = ? ORDER BY last_seq
+    ''', (user_id,))]
+    conn.close()
+    return stats, transitions
+
+
+def _stats(client):
+    data = client.get('/api/history/stats').get_json()
+    return {name: [(item['track_key'], item['play_count']) for item in items] for name, items in data.items()}
+
+
+def _rebuild(user_id):
+    conn = get_db()
+    rebuild_play_stats(conn.cursor(), user_id)
+    conn.commit()
+    conn.close()
+
+
+def test_rebuild_matches_incremental_stats(login):
+    user_id, client = login('alice')
+    for video_id in PLAYS:
+        _play(client, video_id)
+    incremental, lists = _snapshot(user_id), _stats(client)
+
+    _rebuild(user_id)
+
+    assert _snapshot(user_id) == incremental
+    assert _stats(client) == lists
+    assert lists == {
+        'recent': [('https://example.com/radio', 1), ('bbbbbbbbbbb', 2), ('aaaaaaaaaaa', 3), ('ccccccccccc', 1)],
+        'top': [('aaaaaaaaaaa', 3), ('bbbbbbbbbbb', 2), ('https://example.com/radio', 1), ('ccccccccccc', 1)],
+        'next': [],
+    }
+    assert incremental[1] == [
+        ('bbbbbbbbbbb', 'aaaaaaaaaaa', 1),
+        ('aaaaaaaaaaa', 'ccccccccccc', 1),
+        ('ccccccccccc', 'aaaaaaaaaaa', 1),
+        ('aaaaaaaaaaa', 'bbbbbbbbbbb', 2),
+        ('bbbbbbbbbbb', 'https://example.com/radio', 1),
+    ]
+
+
+def test_plays_after_rebuild_are_ordered_after_rebuilt_ones(login):
+    user_id, client = login('alice')
+    for video_id in PLAYS:
+        _play(client, video_id)
+    _rebuild(user_id)
+
+    _play(client, 'ccccccccccc')
+    _play(client, 'aaaaaaaaaaa')
+    mixed, lists = _snapshot(user_id), _stats(client)
+
+    assert [row[0] for row in mixed[0][-2:]] == ['ccccccccccc', 'aaaaaaaaaaa']
+    assert [key for key, _ in lists['recent'][:2]] == ['aaaaaaaaaaa', 'ccccccccccc']
+    assert lists['next'] == [('bbbbbbbbbbb', 2), ('ccccccccccc', 2)]
+
+    _rebuild(user_id)
+
+    assert _snapshot(user_id) == mixed
+    assert _stats(client) == lists
+
+
+def test_imported_history_gets_the_same_stats(login, downloads_dir):
+    alice, alice_client = login('alice')
+    bob, bob_client = login('bob')
+    for video_id in PLAYS:
+        _play(alice_client, video_id)
+    # Reproduções reais ficam a minutos de distância; a importação deduplica por (URL, horário)
+    conn = get_db()
+    conn.execute("UPDATE history SET played_at = datetime('2026-01-01', '+' || id || ' minutes')")
+    conn.commit()
+    conn.close()
+    _rebuild(alice)
+    archive = io.BytesIO(b''.join(transfer.export_archive(downloads_dir, [alice])))
+
+    transfer.import_archive(archive, downloads_dir, bob)
+
+    assert _snapshot(bob) == _snapshot(alice)
+    assert _stats(bob_client) == _stats(alice_client)
@@ -0,0 +1,39 @@
+import prefetch
+
+TRACKS = ['a.mp3', 'b.mp3', 'c.mp3', 'd.mp3']
+
+
+def test_upcoming_follows_library_order():
+    assert prefetch.upcoming(TRACKS, 'b.mp3') == ['c.mp3', 'd.mp3', 'a.mp3']
+
+
+def test_upcoming_wraps_around_without_current():
+    assert prefetch.upcoming(TRACKS, 'd.mp3', n=4) == ['a.mp3', 'b.mp3', 'c.mp3']
+
+
+def test_repeat_puts_current_first():
+    assert prefetch.upcoming(TRACKS, 'b.mp3', repeat=True) == ['b.mp3', 'c.mp3', 'd.mp3']
+
+
+def test_shuffle_order_is_stable_for_a_seed():
+    order = prefetch.play_order(TRACKS, shuffle=True, seed='42')
+
+    assert sorted(order) == TRACKS
+    assert prefetch.play_order(list(reversed(TRACKS)), shuffle=True, seed='42') == order
+    assert prefetch.play_order(TRACKS, shuffle=True, seed='43') != order
+    current = order[1]
+    assert prefetch.upcoming(TRACKS, current, shuffle=True, seed='42', n=2) == order[2:4]
+
+
+def test_single_track_library():
+    assert prefetch.upcoming(['a.mp3'], 'a.mp3') == ['a.mp3']
+    assert prefetch.upcoming(['a.mp3'], 'a.mp3', repeat=True, n=1) == ['a.mp3']
+
+
+def test_unknown_current_starts_from_the_beginning():
+    assert prefetch.upcoming(TRACKS, 'x.mp3', n=2) == ['a.mp3', 'b.mp3']
+    assert prefetch.upcoming(TRACKS, 'x.mp3', repeat=True, n=2) == ['a.mp3', 'b.mp3']
+
+
+def test_empty_library():
+    assert prefetch.upcoming([], 'a.mp3') == []
@@ -0,0 +1,117 @@
+import io
+import json
+import os
+import zipfile
+
+import database
+import dedup
+import transfer
+from conftest import add_download, write_file
+from database import get_db
+
+
+def _export(downloads_dir, user_ids=None):
+    return io.BytesIO(b''.join(transfer.export_archive(downloads_dir, user_ids)))
+
+
+def _count(table):
+    conn = get_db()
+    count = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+    conn.close()
+    return count
+
+
+def test_import_twice_is_idempotent(login, downloads_dir):
+    user_id, _ = login('alice')
+    write_file(downloads_dir, 'Musica [aaaaaaaaaaa].mp3', b'audio')
+    add_download(user_id, 'Musica [aaaaaaaaaaa].mp3')
+    archive = _export(downloads_dir, [user_id]).getvalue()
+
+    first, _ = transfer.import_archive(io.BytesIO(archive), downloads_dir, user_id)
+    second, _ = transfer.import_archive(io.BytesIO(archive), downloads_dir, user_id)
+
+    assert first['downloads'] == 0 and second['downloads'] == 0
+    assert second['files'] == 0
+    assert _count('downloads') == 1
+    assert os.listdir(downloads_dir) == ['Musica [aaaaaaaaaaa].mp3']
+
+
+def test_import_into_new_instance_indexes_tracks(login, downloads_dir, tmp_path, monkeypatch):
+    user_id, _ = login('alice')
+    write_file(downloads_dir, 'Musica [aaaaaaaaaaa].mp3', b'audio')
+    add_download(user_id, 'Musica [aaaaaaaaaaa].mp3')
+    archive = _export(downloads_dir, [user_id])
+
+    # Outra instância: banco e pasta vazios
+    monkeypatch.setattr(database, 'DATABASE_PATH', str(tmp_path / 'other.db'))
+    other_dir = str(tmp_path / 'other-downloads')
+    database.init_db()
+    target = database.User.create('bob', 'bob@example.com', 'senha123')
+
+    stats, _ = transfer.import_archive(archive, other_dir, target)
+
+    assert stats['files'] == 1 and stats['downloads'] == 1
+    # Um download futuro do mesmo vídeo é pulado
+    assert dedup.lookup_source(other_dir, 'aaaaaaaaaaa') == 'Musica [aaaaaaaaaaa].mp3'
+
+
+def test_import_reuses_identical_audio_stored_under_another_name(login, downloads_dir, tmp_path, monkeypatch):
+    user_id, _ = login('alice')
+    write_file(downloads_dir, 'Exportada [bbbbbbbbbbb].mp3', b'audio')
+    add_download(user_id, 'Exportada [bbbbbbbbbbb].mp3', 'https://youtu.be/bbbbbbbbbbb')
+    archive = _export(downloads_dir, [user_id])
+
+    monkeypatch.setattr(database, 'DATABASE_PATH', str(tmp_path / 'other.db'))
+    other_dir = str(tmp_path / 'other-downloads')
+    os.makedirs(other_dir)
+    database.init_db()
+    target = database.User.create('bob', 'bob@example.com', 'senha123')
+    existing = write_file(other_dir, 'Local [aaaaaaaaaaa].mp3', b'audio')
+    dedup.register(other_dir, existing, 'aaaaaaaaaaa')
+
+    stats, _ = transfer.import_archive(archive, other_dir, target)
+
+    assert stats['files'] == 0 and stats['files_skipped'] == 1
+    assert os.listdir(other_dir) == ['Local [aaaaaaaaaaa].mp3']
+    conn = get_db()
+    filenames = [row['filename'] for row in conn.execute('SELECT filename FROM downloads WHERE user_id = ?', (target,))]
+    conn.close()
+    assert filenames == ['Local [aaaaaaaaaaa].mp3']
+    assert dedup.lookup_source(other_dir, 'bbbbbbbbbbb') == 'Local [aaaaaaaaaaa].mp3'
+
+
+def _manifest_only(*records):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zf:
+        zf.writestr(transfer.MANIFEST_NAME, '\n'.join(json.dumps(record) for record in records))
+    buffer.seek(0)
+    return buffer
+
+
+def test_import_cannot_claim_another_users_track(login, downloads_dir):
+    alice, _ = login('alice')
+    mallory, _ = login('mallory')
+    write_file(downloads_dir, 'Musica [aaaaaaaaaaa].mp3', b'audio')
+    add_download(alice, 'Musica [aaaaaaaaaaa].mp3')
+    archive = _manifest_only({'type': 'download', 'title': 'Musica', 'filename': 'Musica [aaaaaaaaaaa].mp3',
+                              'youtube_url': 'https://youtu.be/zzzzzzzzzzz'})
+
+    stats, _ = transfer.import_archive(archive, downloads_dir, mallory)
+
+    assert stats['downloads'] == 0
+    conn = get_db()
+    rows = conn.execute('SELECT id FROM downloads WHERE user_id = ?', (mallory,)).fetchall()
+    conn.close()
+    assert rows == []
+
+
+def test_import_without_audio_keeps_records_for_owned_tracks(login, downloads_dir):
+    alice, _ = login('alice')
+    write_file(downloads_dir, 'Musica [aaaaaaaaaaa].mp3', b'audio')
+    add_download(alice, 'Musica [aaaaaaaaaaa].mp3')
+    archive = _manifest_only({'type': 'download', 'title': 'Musica', 'filename': 'Musica [aaaaaaaaaaa].mp3',
+                              'youtube_url': 'https://youtu.be/aaaaaaaaaaa'})
+
+    stats, _ = transfer.import_archive(archive, downloads_dir, alice)
+
+    assert stats['downloads'] == 1
@@ -0,0 +1,334 @@
+"""Exportação e importação dos dados de usuários entre instâncias.
+
+O arquivo exportado é um ZIP com as músicas em audio/ e, ao final, um
+manifest.ndjson com um registro JSON por linha (usuários, downloads,
+histórico, favoritos e playlists). O manifest vai por último para já
+conter o hash SHA-256 de cada música, calculado enquanto ela é enviada.
+"""
+import hashlib
+import json
+import os
+import zipfile
+
+import dedup
+from archive import CHUNK_SIZE, stream_zip
+from database import get_db, bump_list_version, rebuild_play_stats
+
+MANIFEST_NAME = 'manifest.ndjson'
+AUDIO_PREFIX = 'audio/'
+
+# Linhas inseridas por transação durante a importação
+BATCH_SIZE = 500
+
+# Colunas exportadas de cada tabela ligada ao usuário
+TABLES = {
+    'download': ('downloads', ['title', 'youtube_url', 'filename', 'downloaded_at']),
+    'history': ('history', ['title', 'youtube_url', 'video_id', 'playlist_id', 'thumbnail', 'played_at']),
+    'favorite': ('favorites', ['title', 'youtube_url', 'video_id', 'playlist_id', 'thumbnail', 'added_at']),
+    'playlist': ('playlists', ['name', 'youtube_url', 'video_id', 'playlist_id', 'thumbnail', 'created_at']),
+}
+
+# Colunas que identificam um registro já existente (evita duplicar em reimportações)
+DEDUP_KEYS = {
+    'download': ['youtube_url', 'filename'],
+    'history': ['youtube_url', 'played_at'],
+    'favorite': ['youtube_url'],
+    'playlist': ['youtube_url'],
+}
+
+
+def _is_safe_filename(filename):
+    return bool(filename) and os.path.basename(filename) == filename and not filename.startswith('.')
+
+
+def _user_filter(user_ids):
+    if user_ids is None:
+        return '', ()
+    placeholders = ', '.join('?' for _ in user_ids)
+    return f'WHERE user_id IN ({placeholders})', tuple(user_ids)
+
+
+def _hashing_reader(path, hashes, filename):
+    """Lê o arquivo para o ZIP calculando o hash no caminho"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            yield chunk
+    hashes[filename] = digest.hexdigest()
+
+
+def _manifest_lines(user_ids, hashes):
+    conn = get_db()
+    cursor = conn.cursor()
+    try:
+        if user_ids is None:
+            cursor.execute('SELECT * FROM users ORDER BY id')
+        else:
+            placeholders = ', '.join('?' for _ in user_ids)
+            cursor.execute(f'SELECT * FROM users WHERE id IN ({placeholders}) ORDER BY id', tuple(user_ids))
+        emails = {}
+        for row in cursor.fetchall():
+            emails[row['id']] = row['email']
+            record = {
+                'type': 'user',
+                'username': row['username'],
+                'email': row['email'],
+                'is_admin': bool(row['is_admin']),
+                'created_at': row['created_at'],
+            }
+            # Credenciais só acompanham a exportação completa da instância
+            if user_ids is None:
+                record['password_hash'] = row['password_hash']
+            yield json.dumps(record) + '\n'
+
+        where, params = _user_filter(user_ids)
+        for record_type, (table, columns) in TABLES.items():
+            cursor.execute(f'SELECT user_id, {", ".join(columns)} FROM {table} {where} ORDER BY id', params)
+            for row in cursor:
+                record = {'type': record_type, 'user': emails.get(row['user_id'])}
+                record.update({column: row[column] for column in columns})
+                if record_type == 'download':
+                    record['sha256'] = hashes.get(row['filename'])
+                yield json.dumps(record) + '\n'
+    finally:
+        conn.close()
+
+
+def export_archive(downloads_dir, user_ids=None):
+    """Gera o ZIP de exportação em fluxo; user_ids=None exporta a instância inteira"""
+    hashes = {}
+
+    def entries():
+        where, params = _user_filter(user_ids)
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT DISTINCT filename FROM downloads {where}', params)
+        filenames = [row['filename'] for row in cursor.fetchall()]
+        conn.close()
+
+        for filename in filenames:
+            if not _is_safe_filename(filename):
+                continue
+            path = os.path.join(downloads_dir, filename)
+            if os.path.isfile(path):
+                yield AUDIO_PREFIX + filename, _hashing_reader(path, hashes, filename)
+
+        yield MANIFEST_NAME, _manifest_lines(user_ids, hashes), zipfile.ZIP_DEFLATED
+
+    return stream_zip(entries())
+
+
+class _Importer:
+    """Carrega um arquivo exportado, inserindo as linhas em lotes"""
+
+    def __init__(self, zf, downloads_dir, target_user_id):
+        self.zf = zf
+        self.downloads_dir = downloads_dir
+        self.target_user_id = target_user_id
+        self.conn = get_db()
+        self.cursor = self.conn.cursor()
+        self.users = {}
+        self.renamed = {}
+        self.pending = {record_type: [] for record_type in TABLES}
+        self.touched = set()
+        self.stats = {'users': 0, 'files': 0, 'files_skipped': 0,
+                      **{table: 0 for table, _ in TABLES.values()}}
+
+    def close(self):
+        self.conn.close()
+
+    def _map_user(self, record):
+        if self.target_user_id is not None:
+            return
+        self.cursor.execute('SELECT id FROM users WHERE email = ?', (record['email'],))
+        row = self.cursor.fetchone()
+        if row:
+            self.users[record['email']] = row['id']
+            return
+        if not record.get('password_hash'):
+            return
+
+        username, suffix = record['username'], 1
+        while True:
+            self.cursor.execute('SELECT id FROM users WHERE username = ?', (username,))
+            if not self.cursor.fetchone():
+                break
+            suffix += 1
+            username = f"{record['username']}-{suffix}"
+
+        self.cursor.execute('''
+            INSERT INTO users (username, email, password_hash, is_admin, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (username, record['email'], record['password_hash'],
+              1 if record.get('is_admin') else 0, record.get('created_at')))
+        self.users[record['email']] = self.cursor.lastrowid
+        self.conn.commit()
+        self.stats['users'] += 1
+
+    def _user_id(self, record):
+        if self.target_user_id is not None:
+            return self.target_user_id
+        return self.users.get(record.get('user'))
+
+    def _existing_hash(self, path):
+        try:
+            return dedup.file_sha256(path)
+        except OSError:
+            return None
+
+    def _owns(self, filename):
+        self.cursor.execute('SELECT id FROM downloads WHERE user_id = ? AND filename = ?',
+                            (self.target_user_id, filename))
+        return self.cursor.fetchone() is not None
+
+    def _restore_file(self, filename, expected_hash, video_id=None):
+        """Garante a música no disco, reaproveitando arquivos idênticos já existentes.
+
+        O arquivo passa pelo índice de conteúdo (dedup): áudio já guardado com
+        outro nome não é copiado de novo, e o vídeo de origem fica indexado para
+        que um download futuro dele seja pulado. Retorna None quando o registro
+        deve ser descartado.
+        """
+        if filename in self.renamed:
+            return self.renamed[filename]
+
+        member = AUDIO_PREFIX + filename
+        try:
+            self.zf.getinfo(member)
+        except KeyError:
+            # Sem o áudio no arquivo, o registro só vale para quem já tem a música:
+            # senão um manifest escrito à mão daria acesso a faixas de outros usuários
+            kept = filename if self.target_user_id is None or self._owns(filename) else None
+            self.renamed[filename] = kept
+            return kept
+
+        if expected_hash:
+            existing_name = dedup.lookup_hash(self.downloads_dir, expected_hash)
+            if existing_name:
+                self.stats['files_skipped'] += 1
+                self.renamed[filename] = dedup.register(
+                    self.downloads_dir, os.path.join(self.downloads_dir, existing_name),
+                    video_id, expected_hash)
+                return self.renamed[filename]
+
+        target = filename
+        path = os.path.join(self.downloads_dir, target)
+        suffix = 1
+        while os.path.exists(path):
+            existing = self._existing_hash(path)
+            if expected_hash and existing == expected_hash:
+                self.stats['files_skipped'] += 1
+                self.renamed[filename] = dedup.register(self.downloads_dir, path, video_id, existing)
+                return self.renamed[filename]
+            # Mesmo nome, conteúdo diferente: grava ao lado com sufixo
+            suffix += 1
+            name, ext = os.path.splitext(filename)
+            target = f'{name} ({suffix}){ext}'
+            path = os.path.join(self.downloads_dir, target)
+
+        tmp_path = path + '.importing'
+        with self.zf.open(member) as src, open(tmp_path, 'wb') as dst:
+            while True:
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                dst.write(chunk)
+        os.replace(tmp_path, path)
+        target = dedup.register(self.downloads_dir, path, video_id)
+        if target == os.path.basename(path):
+            self.stats['files'] += 1
+        else:
+            self.stats['files_skipped'] += 1
+        self.renamed[filename] = target
+        return target
+
+    def _flush(self, record_type):
+        rows = self.pending[record_type]
+        if not rows:
+            return
+        table, columns = TABLES[record_type]
+        keys = DEDUP_KEYS[record_type]
+        before = self.conn.total_changes
+        self.cursor.executemany(f'''
+            INSERT INTO {table} (user_id, {", ".join(columns)})
+            SELECT ?, {", ".join("?" for _ in columns)}
+            WHERE NOT EXISTS (
+                SELECT 1 FROM {table}
+                WHERE user_id = ? AND {" AND ".join(f"{key} IS ?" for key in keys)}
+            )
+        ''', rows)
+        inserted = self.conn.total_changes - before
+        if inserted:
+            for user_id in {row[0] for row in rows}:
+                list_name = 'library' if table == 'downloads' else table
+                bump_list_version(self.cursor, user_id, list_name)
+                self.touched.add((user_id, list_name))
+        self.conn.commit()
+        self.stats[table] += inserted
+        rows.clear()
+
+    def add(self, record):
+        record_type = record.get('type')
+        if record_type == 'user':
+            self._map_user(record)
+            return
+        if record_type not in TABLES:
+            return
+
+        user_id = self._user_id(record)
+        if user_id is None:
+            return
+
+        if record_type == 'download':
+            if not _is_safe_filename(record.get('filename')):
+                return
+            filename = self._restore_file(
+                record['filename'], record.get('sha256'), dedup.video_id_from_url(record.get('youtube_url')))
+            if filename is None:
+                return
+            record = dict(record, filename=filename)
+
+        _, columns = TABLES[record_type]
+        values = [record.get(column) for column in columns]
+        keys = [record.get(key) for key in DEDUP_KEYS[record_type]]
+        self.pending[record_type].append((user_id, *values, user_id, *keys))
+        if len(self.pending[record_type]) >= BATCH_SIZE:
+            self._flush(record_type)
+
+    def finish(self):
+        for record_type in TABLES:
+            self._flush(record_type)
+
+        # Histórico importado pode ser anterior ao existente: estatísticas recalculadas
+        for user_id, list_name in self.touched:
+            if list_name == 'history':
+                rebuild_play_stats(self.cursor, user_id)
+        self.conn.commit()
+
+
+def import_archive(fileobj, downloads_dir, target_user_id=None):
+    """Importa um ZIP exportado; com target_user_id todos os dados vão para esse usuário.
+
+    Retorna as estatísticas da importação e o conjunto (user_id, lista) alterado.
+    """
+    os.makedirs(downloads_dir, exist_ok=True)
+    with zipfile.ZipFile(fileobj) as zf:
+        if MANIFEST_NAME not in zf.namelist():
+            raise ValueError('Arquivo de exportação inválido: manifest ausente')
+
+        importer = _Importer(zf, downloads_dir, target_user_id)
+        try:
+            with zf.open(MANIFEST_NAME) as manifest:
+                for line in manifest:
+                    line = line.strip()
+                    if line:
+                        importer.add(json.loads(line))
+            importer.finish()
+        finally:
+            importer.close()
+
+    return importer.stats, importer.touched
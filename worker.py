@@ -0,0 +1,30 @@
+"""Worker da fila compartilhada de jobs (implantação com várias instâncias).
+
+Uso: REDIS_URL=redis://... python worker.py
+"""
+import threading
+
+import downloader  # noqa: F401  (registra as tarefas de download e análise)
+import jobs
+
+
+def main():
+    # O worker existe para os downloads: carrega o yt-dlp e o NumPy/SciPy antes do primeiro job
+    import loudness  # noqa: F401
+    import yt_dlp  # noqa: F401
+
+    stop = threading.Event()
+    threads = [threading.Thread(target=jobs.work, args=(stop,), name=f'worker-{i}', daemon=True)
+               for i in range(jobs.JOB_WORKERS)]
+    for thread in threads:
+        thread.start()
+    print(f'Worker iniciado com {len(threads)} threads')
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        stop.set()
+
+
+if __name__ == '__main__':
+    main()